@@ -59,8 +59,8 @@ class ABCCalculation(ABC):
         :param springs: Defines the elasticity values for base and head of tower:
                             base_cx         [N/m]
                             base_cy         [N/m]
-                            base_phix       [N/m]
-                            base_phiy       [N/m]
+                            base_phix       [Nm/rad]
+                            base_phiy       [Nm/rad]
                             head_cx         [N/m]
                             ->
                             springs = {'base_cx': val,
@@ -119,6 +119,10 @@ class ABCCalculation(ABC):
                             fem_nbr_eigen_freq  []
                             fem_dmas            []
                             fem_exc             []
+                            fem_solver          [] optional: 'auto' (default), 'shift_invert', 'banded', 'lobpcg',
+                                                   'dense'
+                            fem_decouple        [] optional: True (default) solves uncoupled DOFs as independent
+                                                   sub-problems
                             ->
                             calculation_param = {'fem_density': val,
                                                  'fem_nbr_eigen_freq': val,
@@ -137,7 +141,7 @@ class ABCCalculation(ABC):
     def return_solution(self):
         """
         :return: Dict[Dict[...]] -> Dict for eigenfrequencies: interpolation nodes and their respective
-        displacement
+        displacement, may be a read-only Mapping that computes the entries on access (see solution.ModalSolution)
         ->
         return {0: {'eigenfreq': 123,
                     'solution': [[0,0],[x1, y1],[x_max, y_max},
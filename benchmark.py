@@ -0,0 +1,187 @@
+"""
+#######################################################################
+LICENSE INFORMATION
+This file is part of Windforce.
+
+Windforce is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Windforce is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Windforce. If not, see <https://www.gnu.org/licenses/>.
+#######################################################################
+
+#######################################################################
+Description:
+Scaling benchmark of the Calculation pipeline, times every stage of start_calc and records the peak memory
+Usage: python benchmark.py [--axis fem_density] [--repeat 3] [-o results.jsonl] [--compare baseline.jsonl]
+#######################################################################
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict
+from calculation import Calculation
+
+# Values of each scaled parameter, the other parameters are kept at BASE_CONFIG
+SCALING_AXES = {'fem_density': [1, 3, 10, 30, 100, 300, 1000],
+                'num_sections': [1, 3, 10, 30, 100, 200],
+                'nbr_eigen_freq': [1, 3, 10, 20, 50]}
+BASE_CONFIG = {'fem_density': 10, 'num_sections': 10, 'nbr_eigen_freq': 10}
+# Stages of the pipeline that have no timing of their own, reported with every result
+UNTIMED_STAGES = {'boundary conditions': "constrained DOFs are skipped when the free DOFs are numbered (meshing) "
+                                         "and during assembly, there is no separate removal step"}
+
+
+def tower_input(fem_density: int, num_sections: int, nbr_eigen_freq: int, tower_height: float = 120.,
+                solver: str = 'auto') -> Dict:
+    """
+    Builds the input of a conical steel tower of equally high sections, the number of elements is
+    fem_density * num_sections
+    :param fem_density: elements per section
+    :param num_sections: number of sections
+    :param nbr_eigen_freq: number of eigenfrequencies
+    :param tower_height: total height [m]
+    :param solver: eigensolver, see eigensolvers.select_solver
+    :return: Dict with the six input dicts
+    """
+    ra_bot, ra_top = 3., 1.5
+    section_height = tower_height / num_sections
+    sections = {}
+    for section_id in range(num_sections):
+        sections[str(section_id)] = {'sec_number': section_id,
+                                     'sec_height': section_height,
+                                     'sec_ra_bot': ra_bot - (ra_bot - ra_top) * section_id / num_sections,
+                                     'sec_ra_top': ra_bot - (ra_bot - ra_top) * (section_id + 1) / num_sections,
+                                     'sec_thickness': 3,
+                                     'sec_E': 210000,
+                                     'sec_G': 81000,
+                                     'sec_rho': 7850}
+    return {'sections': sections,
+            'springs': {'base_cx': 0, 'base_cy': 0, 'base_phix': 0, 'base_phiy': 0, 'head_cx': 0},
+            'masses': {'base_m': 0, 'head_m': 0},
+            'forces': {'f_excite': 0, 'f_head': 0, 'm_head': 0, 'f_rotor': 0, 'qu_impulse': 0, 'qo_impulse': 0,
+                       'nbr_periods': 0, 'delta_t': 0, 'num_1': 0, 'num_2': 0},
+            'excentricity': {'exc_ex': 0, 'exc_EA': 1e13, 'exc_EIy': 1e13, 'exc_EIz': 1e13, 'exc_GIt': 1e13,
+                             'exc_mass': 2, 'exc_area': 10, 'exc_Ip': 10},
+            'calculation_param': {'fem_density': fem_density, 'fem_nbr_eigen_freq': nbr_eigen_freq,
+                                  'fem_dmas': 0.05, 'fem_exc': 1, 'fem_solver': solver}}
+
+
+def run_stages(input_parameters: Dict, trace_memory: bool = False):
+    """
+    Runs start_calc once with instrumentation, see Calculation.stats
+    :param input_parameters: Dict with the six input dicts
+    :param trace_memory: record the peak memory allocated during each stage with tracemalloc (slows the run down)
+    :return: calculation, Dict stage -> {'time': [s], 'peak_memory': [bytes] or None, stage specific values}
+    """
+    calculation = Calculation(*[input_parameters[key] for key in ('sections', 'springs', 'masses', 'forces',
+                                                                  'excentricity', 'calculation_param')],
+                              instrument=True, trace_memory=trace_memory)
+    calculation.start_calc()
+    return calculation, calculation.stats['stages']
+
+
+def benchmark(config: Dict, repeat: int = 3, solver: str = 'auto') -> Dict:
+    """
+    Benchmarks one configuration. The times are the minimum of repeat runs, the peak memory is measured in an
+    additional run with tracemalloc (only allocations of Python and NumPy are traced, not those of SuperLU or ARPACK)
+    :param config: Dict with fem_density, num_sections and nbr_eigen_freq
+    :param repeat: number of timed runs
+    :param solver: eigensolver, see eigensolvers.select_solver
+    :return: Dict with the configuration, num_dofs, solver, total time, peak memory, the stages (including the
+             stage specific values, e.g. nnz and solver iterations) and the untimed stages, see UNTIMED_STAGES
+    """
+    input_parameters = tower_input(config['fem_density'], config['num_sections'], config['nbr_eigen_freq'],
+                                   solver=solver)
+    runs = [run_stages(input_parameters)[1] for _ in range(repeat)]
+    calculation, memory_run = run_stages(input_parameters, trace_memory=True)
+    stages = {stage: {**memory_run[stage], 'time': min(run[stage]['time'] for run in runs)}
+              for stage in Calculation.STAGES}
+    return {**config,
+            'num_dofs': int(calculation.free_dofs.size),
+            'solver': calculation.solver_info['solver'],
+            'time': min(sum(stage['time'] for stage in run.values()) for run in runs),
+            'peak_memory': max(stage['peak_memory'] for stage in stages.values()),
+            'stages': stages,
+            'untimed_stages': UNTIMED_STAGES}
+
+
+def compare(results, baseline, threshold: float):
+    """
+    Compares the total times with a baseline of the same configurations
+    :param results: list of result Dicts, see benchmark
+    :param baseline: list of result Dicts of an earlier run
+    :param threshold: ratio of the times above which a configuration counts as regression
+    :return: list of (result, baseline time) of the regressions
+    """
+    baseline_times = {(entry['fem_density'], entry['num_sections'], entry['nbr_eigen_freq']): entry['time']
+                      for entry in baseline}
+    regressions = []
+    for result in results:
+        baseline_time = baseline_times.get((result['fem_density'], result['num_sections'], result['nbr_eigen_freq']))
+        if baseline_time is not None and result['time'] > threshold * baseline_time:
+            regressions.append((result, baseline_time))
+    return regressions
+
+
+def main(argv=None):
+    """
+    Command line entry point, writes one JSON line per configuration
+    :param argv: command line arguments, defaults to sys.argv[1:]
+    :return: exit code, 1 if a regression was found
+    """
+    parser = argparse.ArgumentParser(description="WindForce scaling benchmark")
+    parser.add_argument('--axis', choices=sorted(SCALING_AXES), action='append',
+                        help="scaled parameter, may be given several times (default: all)")
+    parser.add_argument('--max-value', type=float, default=None,
+                        help="skip values of the scaled parameter above this value, e.g. for quick runs")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per configuration (default: 3)")
+    parser.add_argument('--solver', default='auto', help="eigensolver (default: auto)")
+    parser.add_argument('-o', '--output', default='-', help="output JSON lines file, '-' writes to stdout (default)")
+    parser.add_argument('--compare', default=None, help="JSON lines file of a baseline run")
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help="time ratio to the baseline reported as regression (default: 1.2)")
+    args = parser.parse_args(argv)
+
+    configs = []
+    for axis in args.axis or SCALING_AXES:
+        for value in SCALING_AXES[axis]:
+            if args.max_value is None or value <= args.max_value:
+                configs.append({**BASE_CONFIG, axis: value})
+    # The base configuration is part of every axis, it is only run once
+    configs = [dict(items) for items in dict.fromkeys(tuple(config.items()) for config in configs)]
+
+    file = sys.stdout if args.output == '-' else open(args.output, "w")
+    results = []
+    try:
+        for config in configs:
+            result = benchmark(config, repeat=args.repeat, solver=args.solver)
+            results.append(result)
+            file.write(json.dumps(result) + '\n')
+            file.flush()
+    finally:
+        if file is not sys.stdout:
+            file.close()
+
+    if args.compare:
+        with open(args.compare, "r") as baseline_file:
+            baseline = [json.loads(line) for line in baseline_file if line.strip()]
+        regressions = compare(results, baseline, args.threshold)
+        for result, baseline_time in regressions:
+            print(f"regression: fem_density={result['fem_density']} num_sections={result['num_sections']} "
+                  f"nbr_eigen_freq={result['nbr_eigen_freq']}: {result['time']:.4f} s "
+                  f"(baseline {baseline_time:.4f} s)", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""
+#######################################################################
+LICENSE INFORMATION
+This file is part of Windforce.
+
+Windforce is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Windforce is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Windforce. If not, see <https://www.gnu.org/licenses/>.
+#######################################################################
+
+#######################################################################
+Description:
+Content-addressed on-disk cache for calculation results with size-bounded LRU eviction
+#######################################################################
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import numpy as np
+from solution import ModalSolution
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'windforce')
+DEFAULT_MAX_SIZE = 512 * 1024 ** 2  # [bytes]
+# An eviction reduces the cache to this fraction of max_size, so that the following writes do not evict again
+EVICTION_TARGET = 0.8
+# The directory is rescanned after this number of writes to account for files written by other processes
+RESCAN_INTERVAL = 256
+
+
+def normalize_input(value):
+    """
+    Normalizes input values so that equal configurations give equal keys: dict keys become strings (sections may
+    be keyed by int or str) and numbers become floats (the GUI enters 5.0 where an input file may contain 5)
+    :param value: input value, e.g. one of the six input dicts
+    :return:
+    """
+    if isinstance(value, dict):
+        return {str(key): normalize_input(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize_input(item) for item in value]
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    return float(value)
+
+
+class ResultCache:
+    """
+    Stores solutions as one .npz file per configuration, named by the hash of the normalized inputs, the solver
+    version and the dtype of the mode shapes. The least recently used entries are evicted when the cache exceeds
+    max_size. The total size is tracked across writes, the directory is only scanned if it exceeds max_size or every
+    RESCAN_INTERVAL writes.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_size: int = DEFAULT_MAX_SIZE):
+        """
+        :param directory: cache directory, created if missing
+        :param max_size: maximum total size of the cache files [bytes]
+        """
+        self.directory = directory
+        self.max_size = max_size
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        # Total size of the cache files [bytes], None until the directory was scanned
+        self.size = None
+        self.writes_since_scan = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(input_parameters, solver_version: str, solution_dtype=np.float64) -> str:
+        """
+        :param input_parameters: list of the six input dicts
+        :param solver_version: version of the calculation, results of other versions are never reused
+        :param solution_dtype: dtype of the mode shapes, see Calculation
+        :return: hex digest identifying the configuration
+        """
+        canonical = json.dumps([solver_version, np.dtype(solution_dtype).str, normalize_input(list(input_parameters))],
+                               sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def get(self, key: str):
+        """
+        :param key: see ResultCache.key
+        :return: solution.ModalSolution or None if not cached
+        """
+        path = self.path(key)
+        try:
+            with np.load(path) as data:
+                solution = ModalSolution(data['nodes'], data['eigenfreqs'], data['displacements'])
+            # Mark as recently used
+            os.utime(path)
+        except (FileNotFoundError, OSError, KeyError, ValueError):
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        return solution
+
+    def put(self, key: str, solution):
+        """
+        Stores a solution, the file is written atomically so that concurrent processes can share the cache
+        :param key: see ResultCache.key
+        :param solution: solution.ModalSolution
+        :return:
+        """
+        file_descriptor, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(file_descriptor, 'wb') as file:
+            np.savez(file, eigenfreqs=solution.eigenfreqs, nodes=solution.nodes, displacements=solution.displacements)
+        size = os.path.getsize(tmp_path)
+        try:
+            size -= os.path.getsize(self.path(key))
+        except OSError:
+            pass
+        os.replace(tmp_path, self.path(key))
+        self.writes_since_scan += 1
+        if self.size is not None:
+            self.size += size
+        if self.size is None or self.size > self.max_size or self.writes_since_scan >= RESCAN_INTERVAL:
+            self.evict()
+
+    def evict(self):
+        """
+        Scans the cache directory and, if it exceeds max_size, deletes the least recently used entries until it fits
+        into EVICTION_TARGET * max_size
+        :return:
+        """
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.npz'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total_size = sum(size for _, size, _ in entries)
+        target_size = self.max_size if total_size <= self.max_size else EVICTION_TARGET * self.max_size
+        for _, size, path in sorted(entries):
+            if total_size <= target_size:
+                break
+            try:
+                os.remove(path)
+                self.stats['evictions'] += 1
+            except FileNotFoundError:
+                pass
+            total_size -= size
+        self.size = total_size
+        self.writes_since_scan = 0
+
+    def clear(self):
+        """
+        Deletes all entries
+        :return:
+        """
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.npz'):
+                os.remove(entry.path)
+        self.size = 0
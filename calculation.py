@@ -23,46 +23,210 @@ Calculation file
 #######################################################################
 """
 
-from typing import Dict
+from contextlib import contextmanager
+from typing import Callable, Dict
 from abccalculation import ABCCalculation
-from scipy.sparse import csr_array
-from scipy.sparse.linalg import eigsh
+from cache import normalize_input
+from eigensolvers import factorize, solve_eigen, solve_eigen_blocks
+from instrumentation import Instrumentation
+from mesh import Mesh
+from solution import ModalSolution
+from scipy.sparse import csr_array, diags_array
 import numpy as np
+import json
+import logging
 import math
 
+logger = logging.getLogger(__name__)
+
+# Version of the calculation results, increase whenever results change (invalidates cached results)
+SOLVER_VERSION = '1.2.0'
+
+# DOF types (ux, uy, uz, phix, phiy, phiz = 0..5) of the independent sub-problems of a vertical tower without
+# excentricity: bending in the x-z plane, bending in the y-z plane, axial and torsion
+_DECOUPLED_DOF_TYPES = ((0, 4), (1, 3), (2,), (5,))
+# DOF type of the y-z bending problem corresponding to each DOF type of the x-z bending problem (ux -> uy, phiy -> phix)
+_BENDING_YZ_TYPE = np.array([1, -1, -1, -1, 3, -1])
+# DOF types of the discrete springs of the springs input at the tower base (node 0) and the tower head
+_BASE_SPRING_DOF_TYPES = {'base_cx': 0, 'base_cy': 1, 'base_phix': 3, 'base_phiy': 4}
+_HEAD_SPRING_DOF_TYPES = {'head_cx': 0}
+# Inputs the model (mesh, system matrices and modes) is built from, the forces only enter the load vectors
+_MODEL_INPUT_KEYS = ('sections', 'springs', 'masses', 'excentricity', 'calculation_param')
+
+
+# Non-zero entries of the local 12x12 element stiffness matrix, grouped by stiffness term.
+# Each entry is (row, column, factor), the matrix entry being factor * term.
+# Terms: ea / l, ei_z / l^3, ei_z / l^2, ei_z / l, ei_y / l^3, ei_y / l^2, ei_y / l, gi_t / l
+_K_LOC_ENTRIES = [
+    [(0, 0, 1), (0, 6, -1), (6, 0, -1), (6, 6, 1)],
+    [(1, 1, 12), (1, 7, -12), (7, 1, -12), (7, 7, 12)],
+    [(1, 5, 6), (1, 11, 6), (5, 1, 6), (5, 7, -6), (7, 5, -6), (7, 11, -6), (11, 1, 6), (11, 7, -6)],
+    [(5, 5, 4), (5, 11, 2), (11, 5, 2), (11, 11, 4)],
+    [(2, 2, 12), (2, 8, -12), (8, 2, -12), (8, 8, 12)],
+    [(2, 4, -6), (2, 10, -6), (4, 2, -6), (4, 8, 6), (8, 4, 6), (8, 10, 6), (10, 2, -6), (10, 8, 6)],
+    [(4, 4, 4), (4, 10, 2), (10, 4, 2), (10, 10, 4)],
+    [(3, 3, 1), (3, 9, -1), (9, 3, -1), (9, 9, 1)]
+]
+# Non-zero entries of the local 12x12 consistent element mass matrix divided by m * l / 420.
+# Terms: 1, l, l^2, ele_ip / ele_a
+_M_LOC_ENTRIES = [
+    [(0, 0, 140), (0, 6, 70), (6, 0, 70), (6, 6, 140), (1, 1, 156), (1, 7, 54), (7, 1, 54), (7, 7, 156),
+     (2, 2, 156), (2, 8, 54), (8, 2, 54), (8, 8, 156)],
+    [(1, 5, 22), (1, 11, -13), (5, 1, 22), (5, 7, 13), (7, 5, 13), (7, 11, -22), (11, 1, -13), (11, 7, -22),
+     (2, 4, -22), (2, 10, 13), (4, 2, -22), (4, 8, -13), (8, 4, -13), (8, 10, 22), (10, 2, 13), (10, 8, 22)],
+    [(4, 4, 4), (4, 10, -3), (10, 4, -3), (10, 10, 4), (5, 5, 4), (5, 11, -3), (11, 5, -3), (11, 11, 4)],
+    [(3, 3, 140), (3, 9, 70), (9, 3, 70), (9, 9, 140)]
+]
+# The rotation into the vertical orientation (see Elements.calc_element_matrix) maps row/column i of the rotated
+# matrix to row/column _VERTICAL_PERMUTATION[i] of the local matrix with sign _VERTICAL_SIGN[i]
+_VERTICAL_PERMUTATION = np.array([2, 1, 0, 5, 4, 3, 8, 7, 6, 11, 10, 9])
+_VERTICAL_SIGN = np.array([1, 1, -1, 1, 1, -1, 1, 1, -1, 1, 1, -1], dtype=np.float64)
+
+
+def _element_basis(entries, orientation):
+    """
+    Builds the constant basis matrices of one term each, so that an element matrix is the sum of term * basis.
+    The vertical rotation is applied once to the basis as an index permutation and sign flip.
+    :param entries: _K_LOC_ENTRIES or _M_LOC_ENTRIES
+    :param orientation: 'vertical' or 'horizontal'
+    :return: basis of shape (number of terms, 144)
+    """
+    basis = np.zeros((len(entries), 12, 12), dtype=np.float64)
+    for term, term_entries in enumerate(entries):
+        for row, col, factor in term_entries:
+            basis[term, row, col] = factor
+    if orientation == 'vertical':
+        perm = _VERTICAL_PERMUTATION
+        basis = basis[:, perm][:, :, perm] * np.outer(_VERTICAL_SIGN, _VERTICAL_SIGN)
+    return basis.reshape(len(entries), 144)
+
+
+_K_BASIS = {orientation: _element_basis(_K_LOC_ENTRIES, orientation) for orientation in ('vertical', 'horizontal')}
+_M_BASIS = {orientation: _element_basis(_M_LOC_ENTRIES, orientation) for orientation in ('vertical', 'horizontal')}
 
-# Function to delete rows and columns from csr matrix
-def delete_from_csr(mat, row_indices=[], col_indices=[]):
+
+def calc_element_matrices(element_length, ele_a, ea, ei_y, ei_z, gi_t, ele_ip, m, orientation):
+    """
+    Calculates the element stiffness and mass matrices of a batch of elements, see Elements for the reference
+    implementation of a single element. Scalar arguments are broadcast against the array arguments.
+    :param element_length: element lengths [m]
+    :param ele_a: cross-section areas [m^2]
+    :param ea: axial stiffnesses [N]
+    :param ei_y: bending stiffnesses [Nm^2]
+    :param ei_z: bending stiffnesses [Nm^2]
+    :param gi_t: torsional stiffnesses [Nm^2]
+    :param ele_ip: polar moments of inertia [m^4]
+    :param m: masses per unit length [kg/m]
+    :param orientation: 'vertical' or 'horizontal'
+    :return: stacked element stiffness and mass matrices, each of shape (n, 12, 12)
+    """
+    # units: [N], [m] , [kg]
+    l, ele_a, ea, ei_y, ei_z, gi_t, ele_ip, m = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(value, dtype=np.float64)) for value in
+          (element_length, ele_a, ea, ei_y, ei_z, gi_t, ele_ip, m)))
+    k_terms = np.stack([ea / l, ei_z / l ** 3, ei_z / l ** 2, ei_z / l,
+                        ei_y / l ** 3, ei_y / l ** 2, ei_y / l, gi_t / l], axis=1)
+    m_terms = (m * l / 420)[:, np.newaxis] * np.stack([np.ones_like(l), l, l ** 2, ele_ip / ele_a], axis=1)
+    k_matrices = (k_terms @ _K_BASIS[orientation]).reshape(-1, 12, 12)
+    m_matrices = (m_terms @ _M_BASIS[orientation]).reshape(-1, 12, 12)
+    return k_matrices, m_matrices
+
+
+def calc_assembly_pattern(element_dofs, dof_map):
     """
-    Remove the rows and columns  from the CSR sparse matrix `mat`.
-    WARNING: Indices of altered axes are reset in the returned matrix
+    Calculates the CSR sparsity pattern of the system matrices for the given element connectivity and the mapping
+    of every element matrix entry (in element-major, row-major order) to its position in the CSR data vector.
+    Entries of constrained DOFs are mapped to the position nnz behind the data vector and are never assembled.
+    :param element_dofs: global DOF indices of each element, shape (n, 12)
+    :param dof_map: index in the system matrices of each global DOF, -1 if constrained (see mesh.calc_dof_map)
+    :return: Dict with indptr, indices and scatter arrays and the positions of the diagonal entries in the data vector
+    """
+    num_free_dofs = int(dof_map.max()) + 1
+    dofs_per_element = element_dofs.shape[1]
+    element_free_dofs = dof_map[element_dofs]
+    rows = np.repeat(element_free_dofs, dofs_per_element, axis=1).ravel()
+    cols = np.tile(element_free_dofs, (1, dofs_per_element)).ravel()
+    free_entries = (rows >= 0) & (cols >= 0)
+    # Sorting the linear indices gives the canonical CSR order (by row, then column), duplicates are summed
+    unique_keys, free_scatter = np.unique(rows[free_entries] * num_free_dofs + cols[free_entries],
+                                          return_inverse=True)
+    scatter = np.full(rows.size, unique_keys.size, dtype=np.int64)
+    scatter[free_entries] = free_scatter.ravel()
+    indices = (unique_keys % num_free_dofs).astype(np.int32)
+    indptr = np.zeros(num_free_dofs + 1, dtype=np.int32)
+    np.cumsum(np.bincount(unique_keys // num_free_dofs, minlength=num_free_dofs), out=indptr[1:])
+    # Every free DOF belongs to an element, so the pattern contains all diagonal entries
+    diagonal = np.searchsorted(unique_keys, np.arange(num_free_dofs) * (num_free_dofs + 1))
+    return {'element_dofs': element_dofs, 'dof_map': dof_map, 'num_free_dofs': num_free_dofs,
+            'indptr': indptr, 'indices': indices, 'scatter': scatter, 'diagonal': diagonal}
+
+
+def calc_section_properties(section_values, num_elements):
+    """
+    Calculates the element properties of a section discretized into elements of equal length, the cross-section
+    values are taken in the middle of each element
+    :param section_values: values of one section, see ABCCalculation
+    :param num_elements: number of elements of the section
+    :return: element_length, ele_a, ea, ei_y, ei_z, gi_t, ele_ip, m arrays of shape (num_elements,), see
+             calc_element_matrices
+    """
+    # units: [N], [m] , [kg]
+    section_height = section_values['sec_height']
+    element_length = section_height / num_elements
+    section_t = section_values['sec_thickness'] * 10 ** (-2)  # unit conversion cm -> m
+    section_ra_bot = section_values['sec_ra_bot']
+    section_ra_top = section_values['sec_ra_top']
+    element_ra_mid = section_ra_bot - (section_ra_bot - section_ra_top) / section_height * element_length * (
+            np.arange(1, num_elements + 1) - 0.5)
+    element_ri_mid = element_ra_mid - section_t
+    section_e = section_values['sec_E'] * 10 ** 6  # unit conversion MPa -> N/mm²
+    section_g = section_values['sec_G'] * 10 ** 6  # unit conversion MPa -> N/mm²
+    ele_a = math.pi * (element_ra_mid ** 2 - element_ri_mid ** 2)
+    ele_iy = (math.pi / 4) * (element_ra_mid ** 4 - element_ri_mid ** 4)  # Iy = Iz
+    ele_it = (math.pi / 2) * (element_ra_mid ** 4 - element_ri_mid ** 4)
+    ele_ip = 2 * ele_iy
+    m = ele_a * section_values['sec_rho']
+    return (np.full(num_elements, element_length), ele_a, section_e * ele_a, section_e * ele_iy, section_e * ele_iy,
+            section_g * ele_it, ele_ip, m)
+
+
+def interpolate_modes(nodes, free_dofs, eigenvectors, new_nodes, new_free_dofs):
+    """
+    Interpolates mode shapes linearly along the chain of nodes onto another mesh of the same chain, e.g. to warm-start
+    the eigensolver of a refined mesh with the modes of a coarser one
+    :param nodes: node coordinates of shape (n_nodes, 3)
+    :param free_dofs: global indices of the free DOFs of the eigenvectors
+    :param eigenvectors: eigenvectors of the free DOFs (columns)
+    :param new_nodes: node coordinates of the other mesh, shape (n_new_nodes, 3)
+    :param new_free_dofs: global indices of the free DOFs of the other mesh
+    :return: interpolated eigenvectors of the free DOFs of the other mesh
+    """
+    modes = np.zeros((6 * len(nodes), eigenvectors.shape[1]))
+    modes[free_dofs] = eigenvectors
+    modes = modes.reshape(len(nodes), -1)
+    # Position of each node along the chain
+    chain_position = np.concatenate(([0], np.cumsum(np.linalg.norm(np.diff(nodes, axis=0), axis=1))))
+    new_chain_position = np.concatenate(([0], np.cumsum(np.linalg.norm(np.diff(new_nodes, axis=0), axis=1))))
+    new_modes = np.column_stack([np.interp(new_chain_position, chain_position, column) for column in modes.T])
+    return new_modes.reshape(6 * len(new_nodes), -1)[new_free_dofs]
+
+
+def _equal_up_to_signs(matrix_a, matrix_b, signs):
+    """
+    :param matrix_a: sparse matrix
+    :param matrix_b: sparse matrix of the same shape
+    :param signs: array of +1 / -1
+    :return: True if diag(signs) @ matrix_a @ diag(signs) equals matrix_b up to round-off
+    """
+    sign_matrix = diags_array(signs)
+    difference = abs(sign_matrix @ matrix_a @ sign_matrix - matrix_b)
+    return difference.max() <= 1e-12 * abs(matrix_a).max()
+
+
+class CalculationCancelled(Exception):
+    """
+    Raised by a progress callback to cancel a running calculation
     """
-    if not isinstance(mat, csr_array):
-        raise ValueError("works only for CSR format -- use .tocsr() first")
-
-    rows = []
-    cols = []
-    if row_indices:
-        rows = list(row_indices)
-    if col_indices:
-        cols = list(col_indices)
-
-    if len(rows) > 0 and len(cols) > 0:
-        row_mask = np.ones(mat.shape[0], dtype=bool)
-        row_mask[rows] = False
-        col_mask = np.ones(mat.shape[1], dtype=bool)
-        col_mask[cols] = False
-        return mat[row_mask][:, col_mask]
-    elif len(rows) > 0:
-        mask = np.ones(mat.shape[0], dtype=bool)
-        mask[rows] = False
-        return mat[mask]
-    elif len(cols) > 0:
-        mask = np.ones(mat.shape[1], dtype=bool)
-        mask[cols] = False
-        return mat[:, mask]
-    else:
-        return mat
 
 
 class Calculation(ABCCalculation):
@@ -70,172 +234,583 @@ class Calculation(ABCCalculation):
     Concrete class for calculation
     """
 
+    # Stages of start_calc in order of execution, reported to the progress callback
+    STAGES = ('meshing', 'element matrices', 'assembly', 'eigen solve', 'post-processing')
+
     def __init__(self, sections, springs: Dict, masses: Dict,
-                 forces: Dict, excentricity: Dict, calculation_param: Dict):
+                 forces: Dict, excentricity: Dict, calculation_param: Dict, progress: Callable = None,
+                 cache=None, instrument: bool = False, trace_memory: bool = False, solution_dtype=np.float64):
         """
         ...
         :param element_parameters:
+        :param progress: optional callback, called with the name of each stage (see STAGES) when it starts.
+                         It may raise CalculationCancelled to cancel the calculation.
+        :param cache: optional cache.ResultCache, return_solution reuses cached results of equal inputs
+        :param instrument: record the wall time and stage specific values of each stage in self.stats, the stats
+                           are also logged as JSON
+        :param trace_memory: record the peak memory of each stage with tracemalloc, implies instrument
+        :param solution_dtype: dtype of the mode shapes in the solution, e.g. np.float32 to halve their memory
         """
         super().__init__(sections, springs, masses, forces, excentricity, calculation_param)
-        self.number_of_elements = []
-        self.element_matrices = []
+        self.progress = progress
+        self.cache = cache
+        self.instrumentation = Instrumentation(trace_memory) if instrument or trace_memory else None
+        self.stats = {}
+        self.solution_dtype = solution_dtype
+        self.mesh = Mesh.empty()
+        self.element_k_matrices = np.zeros((0, 12, 12))
+        self.element_m_matrices = np.zeros((0, 12, 12))
+        self.point_elements = {}
+        self.assembly_pattern = None
         self.k_glob = np.array([0], dtype=np.float64)
         self.m_glob = np.array([0], dtype=np.float64)
-        self.nodes = np.array([0], dtype=np.float64)
-        self.solution = {}
+        self.model_inputs = None
+        self.model_solved = False
+        self.eigenvectors = None
+        self.stiffness_factor = None
+        self.solution = ModalSolution(np.zeros((0, 3)), np.array([]), np.zeros((0, 6, 0), dtype=solution_dtype))
+        self.solver_info = {}
+
+    @property
+    def nodes(self):
+        """
+        :return: node coordinates of the mesh, shape (n_nodes, 3)
+        """
+        return self.mesh.nodes
+
+    @property
+    def dof_map(self):
+        """
+        :return: index in the system matrices of each global DOF, -1 if constrained, see mesh.calc_dof_map
+        """
+        return self.mesh.dof_map
 
+    @property
+    def free_dofs(self):
+        """
+        :return: global indices of the free DOFs
+        """
+        return self.mesh.free_dofs
 
     def return_solution(self):
         """
-        ...
-        :return:
+        Returns the solution of the current inputs, it is only computed if the model was not yet solved for them
+        (solving is idempotent, the inputs may be edited in place between calls)
+        :return: solution.ModalSolution
         """
-        self.start_calc()
+        if self.is_solved():
+            return self.solution
+        if self.cache is None:
+            self.calc_solution()
+            return self.solution
+        key = self.cache.key([self.sections, self.springs, self.masses, self.forces, self.excentricity,
+                              self.calculation_param], SOLVER_VERSION, self.solution_dtype)
+        solution = self.cache.get(key)
+        if solution is None:
+            self.calc_solution()
+            self.cache.put(key, self.solution)
+        else:
+            # The model (if any) belongs to other inputs or is solved again on demand, see modal_basis. No solve ran,
+            # solver_info and stats of a previous solve must not be reported (or saved) with the cached solution.
+            self.solution = solution
+            self.model_solved = False
+            self.solver_info, self.stats = {}, {}
         return self.solution
 
     def assembly_system_matrix(self):
         """
-        Calculates element matrices for every section, assembly system
+        Assembles the global stiffness and mass matrix of the free DOFs from the element matrices and the discrete
+        springs and masses (see calc_point_elements), constrained DOFs (see self.dof_map) are never assembled. The
+        sparsity pattern only depends on the element connectivity and the DOF map, it is computed once and reused as
+        long as both do not change.
         :return:
         """
-
-        num_elem = len(self.element_matrices)
-        # Pre-allocate lists for the sparse matrix data.
-        # i_g and j_g are used to index the global matrices
-        # k_g and m_g will contain the element matrices in vector format
-        i_g = []
-        j_g = []
-        k_g = []
-        m_g = []
-        num_dofs = 0
-
-        # Convert the element stiffness and mass matrices to vector format (k_g and m_g) and define the corresponding
-        # indices i_g and j_g in the global mass/stiffness matrix
-        for i in range(num_elem):
-            dof_i = self.element_matrices[i]['DOFs']
-            k_i = self.element_matrices[i]['K']
-            m_i = self.element_matrices[i]['M']
-            dof_i_len = len(dof_i)
-            mesh1, mesh2 = np.meshgrid(range(dof_i_len), range(dof_i_len), indexing='ij')
-            ii = mesh1.ravel()
-            jj = mesh2.ravel()
-            i_g.extend(dof_i[ii])
-            j_g.extend(dof_i[jj])
-            k_g.extend(k_i.ravel())
-            m_g.extend(m_i.ravel())
-            max_dof_i = max(dof_i)
-            num_dofs = max(num_dofs, max_dof_i)
-
-        # Create sparse matrices for K and M
-        k_glob = csr_array((k_g, (np.array(i_g) - 1, np.array(j_g) - 1)), shape=(num_dofs, num_dofs), dtype=np.float64)
-        m_glob = csr_array((m_g, (np.array(i_g) - 1, np.array(j_g) - 1)), shape=(num_dofs, num_dofs), dtype=np.float64)
-
-        # Assemble discrete masses and springs
-
-        # Assemble boundary conditions
-        k_glob = delete_from_csr(k_glob, row_indices=[range(6)], col_indices=[range(6)])
-        m_glob = delete_from_csr(m_glob, row_indices=[range(6)], col_indices=[range(6)])
+        element_dofs = self.mesh.element_dofs
+        pattern = self.assembly_pattern
+        if pattern is None or not np.array_equal(pattern['dof_map'], self.dof_map) or \
+                not np.array_equal(pattern['element_dofs'], element_dofs):
+            pattern = self.assembly_pattern = calc_assembly_pattern(element_dofs, self.dof_map)
+        self.point_elements = self.calc_point_elements()
+
+        # Sum the element matrices in vector format into the data vectors of the global matrices, entries of
+        # constrained DOFs are collected behind the data vector and dropped
+        nnz = pattern['indices'].size
+        k_data = np.bincount(pattern['scatter'], weights=self.element_k_matrices.ravel(), minlength=nnz + 1)[:nnz]
+        m_data = np.bincount(pattern['scatter'], weights=self.element_m_matrices.ravel(), minlength=nnz + 1)[:nnz]
+
+        # Assemble discrete masses and springs, they only add to the diagonal
+        point_positions = pattern['diagonal'][self.dof_map[self.point_elements['DOFs']]]
+        np.add.at(k_data, point_positions, self.point_elements['K'])
+        np.add.at(m_data, point_positions, self.point_elements['M'])
+
+        # Create sparse matrices for K and M of the free DOFs
+        num_free_dofs = pattern['num_free_dofs']
+        k_glob = csr_array((k_data, pattern['indices'], pattern['indptr']), shape=(num_free_dofs, num_free_dofs))
+        m_glob = csr_array((m_data, pattern['indices'], pattern['indptr']), shape=(num_free_dofs, num_free_dofs))
 
         # Return global stiffness and mass matrix
         return k_glob, m_glob
 
+    def report_progress(self, stage: str):
+        """
+        Reports the start of a stage to the instrumentation and the progress callback
+        :param stage: name of the stage, see STAGES
+        :return:
+        """
+        if self.instrumentation is not None:
+            self.instrumentation.start_stage(stage)
+        if self.progress is not None:
+            self.progress(stage)
+
+    def record_stats(self, **values):
+        """
+        Records values of the current stage if the calculation is instrumented
+        :param values: JSON serializable values
+        :return:
+        """
+        if self.instrumentation is not None:
+            self.instrumentation.record(**values)
+
+    @contextmanager
+    def instrumented(self, incremental: bool = False):
+        """
+        Instruments one run, the stats are stored in self.stats and logged as JSON when the run succeeds
+        :param incremental: the run updates the previous model, see update
+        :return:
+        """
+        if self.instrumentation is None:
+            yield
+            return
+        self.instrumentation.start()
+        try:
+            yield
+        finally:
+            stats = self.instrumentation.stop()
+        self.stats = {**stats, 'incremental': incremental}
+        logger.info("calculation stats %s", json.dumps(self.stats), extra={'stats': self.stats})
+
+    def calc_constrained_dofs(self):
+        """
+        Returns the constrained DOFs of the support conditions: the tower base (node 0) is clamped, except for the
+        DOFs supported by a base spring (see _BASE_SPRING_DOF_TYPES) greater than 0
+        :return: global indices of the constrained DOFs
+        """
+        spring_supported = [dof_type for spring, dof_type in _BASE_SPRING_DOF_TYPES.items()
+                            if self.springs.get(spring, 0) > 0]
+        return np.setdiff1d(np.arange(6), spring_supported)
+
+    def calc_point_elements(self):
+        """
+        Returns the discrete springs and masses as diagonal entries: the base springs act on their base DOFs, head_cx
+        on ux of the tower head (see Mesh.head_node), base_m and head_m on the translations of the tower base and
+        head. Entries of constrained DOFs are dropped.
+        :return: Dict with the global DOFs, the stiffness [N/m], [Nm/rad] and the mass [kg] of each entry
+        """
+        head_node = self.mesh.head_node
+        springs = [(dof_type, self.springs.get(spring, 0)) for spring, dof_type in _BASE_SPRING_DOF_TYPES.items()]
+        springs += [(6 * head_node + dof_type, self.springs.get(spring, 0))
+                    for spring, dof_type in _HEAD_SPRING_DOF_TYPES.items()]
+        masses = [(6 * node + dof_type, self.masses.get(mass, 0))
+                  for node, mass in ((0, 'base_m'), (head_node, 'head_m')) for dof_type in range(3)]
+        dofs = np.array([dof for dof, _ in springs + masses], dtype=np.int64)
+        k_values = np.array([value for _, value in springs] + [0.] * len(masses))
+        m_values = np.array([0.] * len(springs) + [value for _, value in masses])
+        free = self.dof_map[dofs] >= 0
+        return {'DOFs': dofs[free], 'K': k_values[free], 'M': m_values[free]}
+
+    def calc_head_load(self, f_head=None, m_head=None):
+        """
+        Returns the load vector of the head loads: f_head in x direction and m_head about the y axis, acting on the
+        tower head (see Mesh.head_node) like the head spring and mass
+        :param f_head: head force [N], scalar or one value per load case, defaults to self.forces['f_head']
+        :param m_head: head moment [Nm], scalar or one value per load case, defaults to self.forces['m_head']
+        :return: load vectors of the free DOFs [N], [Nm] of shape (n_free_dofs,) or (n_free_dofs, n_cases)
+        """
+        f_head = self.forces.get('f_head', 0) if f_head is None else f_head
+        m_head = self.forces.get('m_head', 0) if m_head is None else m_head
+        f_head, m_head = np.broadcast_arrays(np.asarray(f_head, dtype=np.float64), np.asarray(m_head, dtype=np.float64))
+        head_node = self.mesh.head_node
+        load = np.zeros((self.dof_map.size,) + f_head.shape)
+        load[6 * head_node] = f_head
+        load[6 * head_node + 4] = m_head
+        return load[self.free_dofs]
+
+    def solve_static(self, f_head=None, m_head=None, nodes=None):
+        """
+        Solves the static load cases of the head loads (see calc_head_load) as one block of right-hand sides. K is
+        factorized once (see eigensolvers.factorize) and the factor is kept until the model changes. The model is
+        built first if it belongs to other inputs, the eigenvalue problem is not solved.
+        :param f_head: head forces [N], scalar or one value per load case, defaults to self.forces['f_head']
+        :param m_head: head moments [Nm], scalar or one value per load case, defaults to self.forces['m_head']
+        :param nodes: indices of the output nodes, defaults to the tower head (see Mesh.head_node)
+        :return: Dict with nodes, displacements [m], [rad] of shape (n_cases, n_nodes, 6) and base_reactions [N],
+                 [Nm] of shape (n_cases, 6), the forces of the supports (clamping and base springs) on node 0
+        """
+        if not self.is_built():
+            with self.instrumented():
+                self.build_model()
+        if self.stiffness_factor is None:
+            self.stiffness_factor, method = factorize(self.k_glob)
+            logger.info("stiffness matrix factorized with %s", method)
+        load = self.calc_head_load(f_head, m_head)
+        load = load.reshape(load.shape[0], -1)
+        displacements = np.zeros((self.dof_map.size, load.shape[1]))
+        displacements[self.free_dofs] = self.stiffness_factor(load)
+        # The supports balance the forces of the elements attached to the base node
+        element_dofs = self.mesh.element_dofs
+        base_elements = np.flatnonzero(np.any(element_dofs < 6, axis=1))
+        element_forces = np.einsum('eij,jec->eic', self.element_k_matrices[base_elements],
+                                   displacements[element_dofs[base_elements].T])
+        base_reactions = np.zeros((6, load.shape[1]))
+        for element_dof_forces, dofs in zip(element_forces, element_dofs[base_elements]):
+            base_reactions += element_dof_forces[dofs < 6][np.argsort(dofs[dofs < 6])]
+        nodes = np.atleast_1d(self.mesh.head_node if nodes is None else np.asarray(nodes))
+        return {'nodes': nodes,
+                'displacements': displacements.reshape(len(self.nodes), 6, -1)[nodes].transpose(2, 0, 1),
+                'base_reactions': base_reactions.T}
+
+    def modal_basis(self):
+        """
+        Returns the modes of the current inputs, the model is built and solved first if the current model belongs
+        to other inputs or the solution was taken from the cache
+        :return: circular eigenfrequencies [rad/s], M-normalized eigenvectors of the free DOFs (columns)
+        """
+        if not self.is_solved():
+            self.calc_solution()
+        return self.solution.eigenfreqs, self.eigenvectors
+
+    def calc_dof_blocks(self):
+        """
+        Splits the free DOFs into the independent sub-problems of _DECOUPLED_DOF_TYPES if K and M do not couple
+        them, e.g. for a vertical tower without excentricity. The y-z bending problem is a copy of the x-z bending
+        problem if their matrices are equal up to the sign of the rotations (circular sections, symmetric supports).
+        :return: list of blocks for eigensolvers.solve_eigen_blocks or None if the DOFs are coupled
+        """
+        free_dof_types = self.free_dofs % 6
+        block_of_type = np.empty(6, dtype=np.int64)
+        for block, dof_types in enumerate(_DECOUPLED_DOF_TYPES):
+            block_of_type[list(dof_types)] = block
+        dof_blocks = block_of_type[free_dof_types]
+        # The assembly pattern contains the structural zeros of the element matrices, only non-zeros couple
+        for matrix in (self.k_glob, self.m_glob):
+            rows = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+            if np.any((dof_blocks[rows] != dof_blocks[matrix.indices]) & (matrix.data != 0)):
+                return None
+        block_dofs = [np.flatnonzero(dof_blocks == block) for block in range(len(_DECOUPLED_DOF_TYPES))]
+
+        # The y-z bending DOFs (uy, phix) of each node correspond to the x-z bending DOFs (ux, phiy)
+        blocks = []
+        bending_xz, bending_yz = block_dofs[:2]
+        if bending_xz.size == bending_yz.size > 0 and \
+                np.array_equal(self.free_dofs[bending_xz] // 6, self.free_dofs[bending_yz] // 6) and \
+                np.array_equal(_BENDING_YZ_TYPE[free_dof_types[bending_xz]], free_dof_types[bending_yz]):
+            signs = np.where(free_dof_types[bending_xz] < 3, 1., -1.)
+            if all(_equal_up_to_signs(matrix[bending_xz][:, bending_xz], matrix[bending_yz][:, bending_yz], signs)
+                   for matrix in (self.k_glob, self.m_glob)):
+                blocks.append({'dofs': bending_xz, 'copies': [(bending_yz, signs)]})
+                block_dofs = block_dofs[2:]
+        blocks += [{'dofs': dofs} for dofs in block_dofs if dofs.size > 0]
+        if len(blocks) == 1 and 'copies' not in blocks[0]:
+            return None
+        return blocks
+
     def solve_system(self):
         """
-        Solves for eigenfrequencies and the respective nodes displacement
+        Solves for eigenfrequencies and the respective nodes displacement. The eigensolver is chosen with
+        calculation_param['fem_solver'] (default 'auto'), information on the solve is stored in self.solver_info.
+        The eigenvectors of a previous solve warm-start the iterative solvers.
         :return:
         """
-        # Solve the generalized eigenvalue problem
-        [eigenvalues_sq, eigenvector] = eigsh(self.k_glob, k=self.calculation_param['fem_nbr_eigen_freq'],
-                                              M=self.m_glob, which='SM')
-        eigenfrequencies = np.sqrt(eigenvalues_sq).real
+        # Solve the generalized eigenvalue problem, as independent sub-problems if the DOFs are decoupled
+        blocks = self.calc_dof_blocks() if self.calculation_param.get('fem_decouple', True) else None
+        if blocks is None:
+            eigenvalues_sq, eigenvector, self.solver_info = solve_eigen(
+                self.k_glob, self.m_glob, self.calculation_param['fem_nbr_eigen_freq'],
+                self.calculation_param.get('fem_solver', 'auto'), initial_vectors=self.eigenvectors)
+        else:
+            eigenvalues_sq, eigenvector, self.solver_info = solve_eigen_blocks(
+                self.k_glob, self.m_glob, self.calculation_param['fem_nbr_eigen_freq'], blocks,
+                self.calculation_param.get('fem_solver', 'auto'), initial_vectors=self.eigenvectors)
+        logger.info("eigensolver %s: %.3f s, %s iterations, max. residual norm %.2e",
+                    self.solver_info['solver'], self.solver_info['time'], self.solver_info['iterations'],
+                    np.max(self.solver_info['residual_norms']))
+        self.record_stats(solver=self.solver_info['solver'], iterations=self.solver_info['iterations'],
+                          warm_start=self.solver_info['warm_start'],
+                          max_residual_norm=float(np.max(self.solver_info['residual_norms'])))
+        eigenfrequencies = np.sqrt(np.maximum(eigenvalues_sq, 0))
         return eigenfrequencies, eigenvector
 
     def start_calc(self):
-        min_height = min(section['sec_height'] for section in self.sections.values())
-        dofs = np.arange(-5, 7)
-        # Extract the section parameters in the first loop and discretize each section into a subset of elements.
-        # Calculate the cross-section radii in the middle of each element
-        for sefc_id, section_values in self.sections.items():
-            sefc_id = int(sefc_id)
-            section_height = section_values['sec_height']
-            self.number_of_elements.append((self.calculation_param['fem_density'] * round(section_height / min_height)))
-            num_elements = self.number_of_elements[sefc_id]
-            element_length = section_height / num_elements
-            max_nodes = max(self.nodes)
-            self.nodes = np.append(self.nodes, np.arange(element_length, section_height + element_length,
-                                                         element_length) + max_nodes)
-            section_t = section_values['sec_thickness'] * 10 ** (-2)  # unit conversion cm -> m
-            section_ra_bot = section_values['sec_ra_bot']
-            section_ra_top = section_values['sec_ra_top']
-            element_ra_mid = section_ra_bot - (section_ra_bot - section_ra_top) / section_height * element_length * (
-                    np.arange(1, num_elements + 1) - 0.5)
-            section_e = section_values['sec_E'] * 10 ** 6  # unit conversion MPa -> N/mm²
-            section_g = section_values['sec_G'] * 10 ** 6  # unit conversion MPa -> N/mm²
-            section_rho = section_values['sec_rho']
-            # Calculate the element stiffness, mass matrix and the connectivity for each section element.
-            # units: [N], [m] , [kg]
-            for index in range(len(element_ra_mid)):
-                element_ri_mid = element_ra_mid[index] - section_t
-                ele_a = math.pi * (element_ra_mid[index] ** 2 - element_ri_mid ** 2)
-                ele_iy = (math.pi / 4) * (element_ra_mid[index] ** 4 - element_ri_mid ** 4)  # Iy = Iz
-                ele_it = (math.pi / 2) * (element_ra_mid[index] ** 4 - element_ri_mid ** 4)
-                ele_ip = 2 * ele_iy
-                ea = section_e * ele_a
-                ei_y = section_e * ele_iy
-                ei_z = section_e * ele_iy
-                gi_t = section_g * ele_it
-                m = ele_a * section_rho
-                element_k_matrix, element_m_matrix = Elements(element_length, ele_a, ea, ei_y, ei_z, gi_t, ele_ip, m,
-                                                              'vertical').calc_element_matrix()
-                dofs = dofs + 6
-                self.element_matrices.append({'DOFs': dofs, 'K': element_k_matrix, 'M': element_m_matrix})
-        # Calculate node matrix "node_seg_ele" containing the nodes of each element of the sections.
-        nodes_seg_ele = np.column_stack((np.zeros(self.nodes.size), np.zeros(self.nodes.size), self.nodes))
-        # Calculate the element stiffness, mass matrix and the connectivity for each excentricity element.
-        # element_length_exc is the element length of the excentricity.
-        # The discretization [elements/m] equals the discretization of the shortest segment.
-        l_exc = self.excentricity['exc_ex']
-        if l_exc > 0:
-            num_elements_exc = max(round(self.calculation_param['fem_density'] * l_exc / min_height), 1)
-            element_length_exc = l_exc / num_elements_exc
-            exc_k_matrix, exc_element_m_matrix = Elements(element_length_exc, self.excentricity['exc_area'],
-                                                          self.excentricity['exc_EA'], self.excentricity['exc_EIy'],
-                                                          self.excentricity['exc_EIz'],
-                                                          self.excentricity['exc_GIt'], self.excentricity['exc_Ip'],
-                                                          self.excentricity['exc_mass'],
-                                                          'horizontal').calc_element_matrix()
-            for index in range(num_elements_exc):
-                dofs = dofs + 6
-                self.element_matrices.append({'DOFs': dofs, 'K': exc_k_matrix, 'M': exc_element_m_matrix})
-            # Construct node matrix "nodes_exc".
-            nodes_exc = np.arange(0, l_exc + element_length_exc, element_length_exc)
-            nodes_exc = np.column_stack(
-                (nodes_exc, np.zeros(nodes_exc.size), np.ones(nodes_exc.size) * np.max(nodes_seg_ele)))
-            self.nodes = np.append(nodes_seg_ele, nodes_exc[1:, :], axis=0)
-        else:
-            self.nodes = nodes_seg_ele
+        """
+        Builds the model from the current inputs and solves it, a previous model is always replaced
+        :return:
+        """
+        with self.instrumented():
+            self.build_and_solve()
+
+    def calc_solution(self):
+        """
+        Solves the model of the current inputs, it is only built if it belongs to other inputs (e.g. after
+        solve_static it is already assembled)
+        :return:
+        """
+        with self.instrumented():
+            if not self.is_built():
+                self.build_model()
+            self.solve_and_post_process()
+
+    def build_and_solve(self):
+        """
+        Builds the model from the inputs (see build_model) and solves it
+        :return:
+        """
+        self.build_model()
+        self.solve_and_post_process()
+
+    def build_model(self):
+        """
+        Meshes the tower, calculates the element matrices and assembles the system matrices from the inputs. The
+        modes of a previous model with another mesh are interpolated onto the new mesh to warm-start the eigensolver.
+        :return:
+        """
+        # The model only belongs to the inputs once it is assembled, an error or a cancellation leaves it invalid
+        inputs = self.snapshot_model_inputs()
+        self.model_inputs = None
+        self.model_solved = False
+        self.report_progress('meshing')
+        previous_mesh = self.mesh if self.eigenvectors is not None else None
+        self.mesh = Mesh.from_sections({section_id: section_values['sec_height']
+                                        for section_id, section_values in self.sections.items()},
+                                       self.calculation_param['fem_density'], self.excentricity['exc_ex'])
+        # Number the free DOFs, the constrained DOFs are not assembled
+        self.mesh.number_dofs(self.calc_constrained_dofs())
+        if previous_mesh is not None and not (np.array_equal(previous_mesh.nodes, self.nodes) and
+                                              np.array_equal(previous_mesh.free_dofs, self.free_dofs)):
+            self.eigenvectors = interpolate_modes(previous_mesh.nodes, previous_mesh.free_dofs, self.eigenvectors,
+                                                  self.nodes, self.free_dofs)
+        self.record_stats(num_elements=self.mesh.num_elements, num_nodes=self.mesh.num_nodes)
+
+        self.report_progress('element matrices')
+        # Element properties of all section elements, computed per section and passed to the batch kernel in one call
+        section_properties = []
+        for section_id, section_values in self.sections.items():
+            elements = self.mesh.section_elements(section_id)
+            section_properties.append(calc_section_properties(section_values, elements.stop - elements.start))
+        element_k_matrices, element_m_matrices = calc_element_matrices(
+            *(np.concatenate(column) for column in zip(*section_properties)), 'vertical')
+        # The excentricity elements follow the section elements
+        if self.mesh.excentricity_elements.stop > self.mesh.excentricity_elements.start:
+            exc_k_matrices, exc_m_matrices = self.calc_excentricity_matrices()
+            element_k_matrices = np.concatenate((element_k_matrices, exc_k_matrices))
+            element_m_matrices = np.concatenate((element_m_matrices, exc_m_matrices))
+        self.element_k_matrices, self.element_m_matrices = element_k_matrices, element_m_matrices
 
         # Assemble global matrices
+        self.report_progress('assembly')
         self.k_glob, self.m_glob = self.assembly_system_matrix()
+        self.stiffness_factor = None
+        self.record_stats(num_dofs=int(self.free_dofs.size), nnz_k=int(self.k_glob.nnz), nnz_m=int(self.m_glob.nnz))
+        self.model_inputs = inputs
 
+    def calc_excentricity_matrices(self):
+        """
+        Calculates the element stiffness and mass matrices of the excentricity elements (see
+        Mesh.excentricity_elements), all excentricity elements have equal length and properties
+        :return: element stiffness and mass matrices, each of shape (number of excentricity elements, 12, 12)
+        """
+        exc_elements = self.mesh.excentricity_elements
+        num_elements_exc = exc_elements.stop - exc_elements.start
+        exc_k_matrices, exc_m_matrices = calc_element_matrices(self.excentricity['exc_ex'] / num_elements_exc,
+                                                               self.excentricity['exc_area'],
+                                                               self.excentricity['exc_EA'],
+                                                               self.excentricity['exc_EIy'],
+                                                               self.excentricity['exc_EIz'],
+                                                               self.excentricity['exc_GIt'],
+                                                               self.excentricity['exc_Ip'],
+                                                               self.excentricity['exc_mass'], 'horizontal')
+        return (np.repeat(exc_k_matrices, num_elements_exc, axis=0),
+                np.repeat(exc_m_matrices, num_elements_exc, axis=0))
+
+    def solve_and_post_process(self):
+        """
+        Solves the eigenvalue problem of the assembled model and stores the normalized mode shapes in self.solution
+        as one displacement array of shape (n_nodes, 6, n_modes)
+        :return:
+        """
+        # The solution only belongs to the model once it is post-processed
+        self.model_solved = False
         # Solve eigenvalue problem to calculate eigenfrequencies and eigenmodes
+        self.report_progress('eigen solve')
         eigenfrequencies, eigenvectors = self.solve_system()
+        self.eigenvectors = eigenvectors
         # Calculate node displacements. The max displacement for each eigenmode is set to 1
-        displacements = np.array(eigenvectors)
-        displacements = np.append(np.zeros((6, len(eigenfrequencies))), displacements, axis=0)
-        max_disp_per_mode = np.max(np.abs(displacements), axis=0)
-        displacements = np.transpose(np.transpose(displacements) / max_disp_per_mode.reshape(-1, 1))
-        displacement_ux = displacements[0::6, :]
-        displacement_uy = displacements[1::6, :]
-        displacement_uz = displacements[2::6, :]
-        # Save solution
-        for freq_number, (eigenfreq, solution) in enumerate(zip(eigenfrequencies, eigenvectors)):
-            self.solution[freq_number] = {
-                'eigenfreq': eigenfreq,
-                'solution': self.nodes + np.hstack((displacement_ux[:, freq_number].reshape(-1, 1),
-                                                    displacement_uy[:, freq_number].reshape(-1, 1),
-                                                    displacement_uz[:, freq_number].reshape(-1, 1)))
-            }
+        self.report_progress('post-processing')
+        displacements = np.zeros((self.dof_map.size, len(eigenfrequencies)))
+        displacements[self.free_dofs] = eigenvectors
+        displacements /= np.max(np.abs(displacements), axis=0)
+        # Save solution, the deformed nodes of each mode are computed on access
+        self.solution = ModalSolution(self.nodes, eigenfrequencies,
+                                      displacements.reshape(len(self.nodes), 6, -1).astype(self.solution_dtype,
+                                                                                            copy=False))
+        self.model_solved = True
+
+    def is_built(self):
+        """
+        :return: True if the model was built for the current inputs, i.e. the mesh and the system matrices belong
+                 to them (edits of the forces do not change the model, see snapshot_model_inputs)
+        """
+        return self.model_inputs is not None and self.model_inputs == self.snapshot_model_inputs()
+
+    def is_solved(self):
+        """
+        :return: True if the model was built and solved for the current inputs, i.e. self.solution, the system
+                 matrices and self.eigenvectors belong to them
+        """
+        return self.model_solved and self.is_built()
+
+    def snapshot_inputs(self):
+        """
+        :return: normalized copy of the six inputs, see cache.normalize_input
+        """
+        return normalize_input({'sections': self.sections, 'springs': self.springs, 'masses': self.masses,
+                                'forces': self.forces, 'excentricity': self.excentricity,
+                                'calculation_param': self.calculation_param})
+
+    def snapshot_model_inputs(self):
+        """
+        :return: normalized copy of the inputs the model is built from, i.e. of all inputs except the forces
+        """
+        return normalize_input({key: getattr(self, key) for key in _MODEL_INPUT_KEYS})
+
+    def requires_remeshing(self, inputs):
+        """
+        Checks whether the mesh of the current model is still valid for the given (normalized) inputs
+        :param inputs: normalized model inputs, see snapshot_model_inputs, self.springs must already be the new springs
+        :return: True if the nodes, the element connectivity or the free DOFs change
+        """
+        model_inputs = self.model_inputs
+        if model_inputs is None or list(inputs['sections']) != list(model_inputs['sections']):
+            return True
+        if any(section['sec_height'] != model_inputs['sections'][section_id]['sec_height']
+               for section_id, section in inputs['sections'].items()):
+            return True
+        if (inputs['calculation_param']['fem_density'] != model_inputs['calculation_param']['fem_density'] or
+                inputs['excentricity']['exc_ex'] != model_inputs['excentricity']['exc_ex']):
+            return True
+        # Adding or removing a base spring changes the free DOFs
+        return not np.array_equal(self.calc_constrained_dofs(), np.flatnonzero(self.dof_map < 0))
+
+    def patch_system_matrix(self, elements, k_matrices, m_matrices):
+        """
+        Replaces the element matrices of the given elements and adds the differences to the data arrays of the
+        assembled global matrices, the sparsity pattern is unchanged
+        :param elements: indices of the elements
+        :param k_matrices: new element stiffness matrices, shape (elements, 12, 12)
+        :param m_matrices: new element mass matrices, shape (elements, 12, 12)
+        :return:
+        """
+        scatter = self.assembly_pattern['scatter'].reshape(-1, 144)[elements].ravel()
+        free_entries = scatter < self.assembly_pattern['indices'].size
+        for glob, element_matrices, matrices in ((self.k_glob, self.element_k_matrices, k_matrices),
+                                                 (self.m_glob, self.element_m_matrices, m_matrices)):
+            np.add.at(glob.data, scatter[free_entries], (matrices - element_matrices[elements]).ravel()[free_entries])
+            element_matrices[elements] = matrices
+
+    def patch_point_elements(self):
+        """
+        Adds the changes of the discrete springs and masses to the diagonal of the assembled global matrices, the
+        free DOFs must be unchanged (see requires_remeshing)
+        :return: True if any spring or mass changed
+        """
+        point_elements = self.calc_point_elements()
+        k_delta = point_elements['K'] - self.point_elements['K']
+        m_delta = point_elements['M'] - self.point_elements['M']
+        if not (np.any(k_delta) or np.any(m_delta)):
+            return False
+        positions = self.assembly_pattern['diagonal'][self.dof_map[point_elements['DOFs']]]
+        np.add.at(self.k_glob.data, positions, k_delta)
+        np.add.at(self.m_glob.data, positions, m_delta)
+        self.point_elements = point_elements
+        return True
+
+    def update(self, sections, springs: Dict, masses: Dict, forces: Dict, excentricity: Dict,
+               calculation_param: Dict):
+        """
+        Re-solves after an edit of the inputs, reusing the model of the previous calculation. If the mesh is
+        unchanged, only the element matrices of changed sections (and of the excentricity) are recomputed and
+        patched into the assembled matrices and changed springs and masses only update the diagonal, otherwise the
+        model is rebuilt. In both cases the iterative eigensolvers are warm-started from the previous eigenvectors.
+        :param sections: see ABCCalculation
+        :param springs: see ABCCalculation
+        :param masses: see ABCCalculation
+        :param forces: see ABCCalculation
+        :param excentricity: see ABCCalculation
+        :param calculation_param: see ABCCalculation
+        :return: solution, see return_solution
+        """
+        self.sections, self.springs, self.masses = sections, springs, masses
+        self.forces, self.excentricity, self.calculation_param = forces, excentricity, calculation_param
+        if self.is_solved():
+            return self.solution
+        if self.cache is not None:
+            key = self.cache.key([sections, springs, masses, forces, excentricity, calculation_param], SOLVER_VERSION,
+                                 self.solution_dtype)
+            solution = self.cache.get(key)
+            if solution is not None:
+                # The model still belongs to self.model_inputs, the next update is compared against those
+                self.solution = solution
+                self.model_solved = False
+                self.solver_info, self.stats = {}, {}
+                return self.solution
+
+        inputs = self.snapshot_model_inputs()
+        if self.requires_remeshing(inputs):
+            self.start_calc()
+        else:
+            with self.instrumented(incremental=True):
+                self.patch_and_solve(inputs)
+        if self.cache is not None:
+            self.cache.put(key, self.solution)
+        return self.solution
+
+    def patch_and_solve(self, inputs):
+        """
+        Updates the model of the previous calculation to the given inputs with the same mesh and solves it
+        :param inputs: normalized model inputs, see snapshot_model_inputs
+        :return:
+        """
+        # The patched model is invalid until it is assembled, see build_model
+        model_inputs = self.model_inputs
+        self.model_inputs = None
+        self.model_solved = False
+        # Only the element matrices of the changed sections and of a changed excentricity are recomputed
+        self.report_progress('meshing')
+        changed_sections = [section_id for section_id, section_values in inputs['sections'].items()
+                            if section_values != model_inputs['sections'][section_id]]
+        section_elements = [self.mesh.section_elements(section_id) for section_id in changed_sections]
+        section_properties = [
+            calc_section_properties(inputs['sections'][section_id], elements.stop - elements.start)
+            for section_id, elements in zip(changed_sections, section_elements)]
+        exc_elements = np.arange(self.mesh.excentricity_elements.start, self.mesh.excentricity_elements.stop)
+        exc_changed = inputs['excentricity'] != model_inputs['excentricity'] and exc_elements.size > 0
+        self.record_stats(num_elements=self.mesh.num_elements, num_nodes=self.mesh.num_nodes,
+                          changed_sections=changed_sections, excentricity_changed=bool(exc_changed))
+        self.report_progress('element matrices')
+        patches = []
+        if changed_sections:
+            patches.append((np.concatenate([np.arange(elements.start, elements.stop) for elements in section_elements]),
+                            *calc_element_matrices(*(np.concatenate(column) for column in zip(*section_properties)),
+                                                   'vertical')))
+        if exc_changed:
+            patches.append((exc_elements, *self.calc_excentricity_matrices()))
+        self.report_progress('assembly')
+        for elements, k_matrices, m_matrices in patches:
+            self.patch_system_matrix(elements, k_matrices, m_matrices)
+        self.record_stats(points_changed=self.patch_point_elements())
+        self.stiffness_factor = None
+        self.record_stats(num_dofs=int(self.free_dofs.size), nnz_k=int(self.k_glob.nnz), nnz_m=int(self.m_glob.nnz))
+        self.model_inputs = inputs
+        self.solve_and_post_process()
 
 
 class Elements:
@@ -360,6 +935,5 @@ if __name__ == "__main__":
                          'fem_exc': 1}
 
     calc = Calculation(sections, springs, masses, forces, excentricity, calculation_param)
-    calc.start_calc()
     solution = calc.return_solution()
     print(solution)
@@ -0,0 +1,134 @@
+"""
+#######################################################################
+LICENSE INFORMATION
+This file is part of Windforce.
+
+Windforce is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Windforce is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Windforce. If not, see <https://www.gnu.org/licenses/>.
+#######################################################################
+
+#######################################################################
+Description:
+Campbell diagram and resonance check of the eigenfrequencies against the rotor harmonics (1P, 3P blade passing).
+The rotor speed range [f_min, f_max] excites the band [h f_min, h f_max] of harmonic h. The separation of an
+eigenfrequency f from a band is
+    max((h f_min - f) / (h f_min), (f - h f_max) / (h f_max))
+which is negative inside the band, a design fails if any separation is below the margin. All checks are computed
+for whole batches of designs at once, the eigenfrequencies of a batch are an array (designs, modes) [Hz], NaN where
+a design has fewer modes.
+#######################################################################
+"""
+
+import math
+from typing import Dict
+import numpy as np
+from sweep import SweepResult
+
+DEFAULT_HARMONICS = (1, 3)
+DEFAULT_MARGIN = 0.1
+
+
+def eigenfrequency_matrix(solutions, num_modes: int = None):
+    """
+    Stacks the eigenfrequencies of several solutions
+    :param solutions: iterable of solution.ModalSolution or arrays of circular eigenfrequencies [rad/s]
+    :param num_modes: number of modes, defaults to the maximum of the solutions
+    :return: eigenfrequencies [Hz] of shape (designs, modes), NaN where not available
+    """
+    eigenfreqs = [np.asarray(getattr(solution, 'eigenfreqs', solution), dtype=np.float64) for solution in solutions]
+    num_modes = max((freqs.size for freqs in eigenfreqs), default=0) if num_modes is None else num_modes
+    matrix = np.full((len(eigenfreqs), num_modes), np.nan)
+    for index, freqs in enumerate(eigenfreqs):
+        matrix[index, :min(freqs.size, num_modes)] = freqs[:num_modes]
+    return matrix / (2 * math.pi)
+
+
+def rotor_speed_range(f_rotor, min_speed_ratio: float = 1.):
+    """
+    :param f_rotor: rated rotor frequencies [Hz], scalar or shape (designs,)
+    :param min_speed_ratio: ratio of the minimum to the rated rotor speed, 1 for a fixed speed rotor
+    :return: speed ranges [Hz] of shape (..., 2)
+    """
+    f_rotor = np.asarray(f_rotor, dtype=np.float64)
+    return np.stack([min_speed_ratio * f_rotor, f_rotor], axis=-1)
+
+
+def campbell_lines(speeds, harmonics=DEFAULT_HARMONICS):
+    """
+    :param speeds: rotor speeds [Hz] of shape (n_speeds,)
+    :param harmonics: rotor harmonics, e.g. (1, 3) for 1P and 3P
+    :return: excitation frequencies [Hz] of shape (n_harmonics, n_speeds)
+    """
+    return np.asarray(harmonics, dtype=np.float64)[:, np.newaxis] * np.asarray(speeds, dtype=np.float64)
+
+
+def resonance_check(eigenfreqs, speed_range, harmonics=DEFAULT_HARMONICS, margin: float = DEFAULT_MARGIN) -> Dict:
+    """
+    Checks the eigenfrequencies of a batch of designs against the bands of the rotor harmonics
+    :param eigenfreqs: eigenfrequencies [Hz] of shape (designs, modes), see eigenfrequency_matrix
+    :param speed_range: rotor speed range [f_min, f_max] [Hz], shape (2,) for all designs or (designs, 2)
+    :param harmonics: rotor harmonics, e.g. (1, 3) for 1P and 3P
+    :param margin: required relative separation of every eigenfrequency from every band
+    :return: Dict with arrays of shape (designs, modes, harmonics):
+             crossing_speeds: rotor speed [Hz] at which the harmonic crosses the eigenfrequency, NaN outside the
+                              speed range
+             separation:      relative separation from the band, see module description
+             violations:      separation below the margin
+             and failed: boolean mask of shape (designs,) of the designs with any violation
+    """
+    eigenfreqs = np.atleast_2d(np.asarray(eigenfreqs, dtype=np.float64))[:, :, np.newaxis]
+    speed_range = np.broadcast_to(np.asarray(speed_range, dtype=np.float64), (eigenfreqs.shape[0], 2))
+    harmonics = np.asarray(harmonics, dtype=np.float64)
+    band_low = (speed_range[:, 0, np.newaxis] * harmonics)[:, np.newaxis, :]
+    band_high = (speed_range[:, 1, np.newaxis] * harmonics)[:, np.newaxis, :]
+
+    crossing_speeds = eigenfreqs / harmonics
+    crossing_speeds = np.where((eigenfreqs >= band_low) & (eigenfreqs <= band_high), crossing_speeds, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        separation = np.maximum((band_low - eigenfreqs) / band_low, (eigenfreqs - band_high) / band_high)
+    # Missing modes (NaN) are no violation
+    violations = separation < margin
+    return {'crossing_speeds': crossing_speeds,
+            'separation': separation,
+            'violations': violations,
+            'failed': violations.any(axis=(1, 2))}
+
+
+def check_sweep(sweep_result: SweepResult, base_input: Dict, min_speed_ratio: float = 1.,
+                harmonics=DEFAULT_HARMONICS, margin: float = DEFAULT_MARGIN) -> Dict:
+    """
+    Resonance check of all configurations of a sweep, the rated rotor speed of each configuration is its
+    forces.f_rotor (swept or from the base input). Failed configurations of the sweep are not flagged.
+    :param sweep_result: sweep.SweepResult
+    :param base_input: Dict with the six input dicts of the sweep
+    :param min_speed_ratio: ratio of the minimum to the rated rotor speed, 1 for a fixed speed rotor
+    :param harmonics: rotor harmonics
+    :param margin: required relative separation
+    :return: Dict, see resonance_check
+    """
+    f_rotor = sweep_result.parameters.get('forces.f_rotor', np.full(len(sweep_result), base_input['forces']['f_rotor']))
+    return resonance_check(sweep_result.eigenfreqs / (2 * math.pi), rotor_speed_range(f_rotor, min_speed_ratio),
+                           harmonics, margin)
+
+
+def check_calculations(calculations, min_speed_ratio: float = 1., harmonics=DEFAULT_HARMONICS,
+                       margin: float = DEFAULT_MARGIN) -> Dict:
+    """
+    Resonance check of several calculations, the rated rotor speed of each is its forces['f_rotor']
+    :param calculations: iterable of calculation.Calculation, solved if necessary (see return_solution)
+    :return: Dict, see resonance_check
+    """
+    calculations = list(calculations)
+    eigenfreqs = eigenfrequency_matrix(calculation.return_solution() for calculation in calculations)
+    f_rotor = [calculation.forces['f_rotor'] for calculation in calculations]
+    return resonance_check(eigenfreqs, rotor_speed_range(f_rotor, min_speed_ratio), harmonics, margin)
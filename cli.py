@@ -0,0 +1,212 @@
+"""
+#######################################################################
+LICENSE INFORMATION
+This file is part of Windforce.
+
+Windforce is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Windforce is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Windforce. If not, see <https://www.gnu.org/licenses/>.
+#######################################################################
+
+#######################################################################
+Description:
+Headless command line interface for batch calculations, does not import the GUI
+Usage: python cli.py input_1.json input_2.json ... [-o results.json] [-j jobs]
+       cat input.json | python cli.py - > results.json
+#######################################################################
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict
+import numpy as np
+from cache import ResultCache
+from calculation import Calculation
+from frequencyresponse import excitation_frequencies, frequency_response
+from resultfile import solver_metadata
+from sweep import INPUT_KEYS
+
+
+def read_inputs(paths):
+    """
+    Reads the input files (schema written by the GUI with 'Save Input File'). '-' reads stdin, which may contain
+    one input object, a list of input objects or one input object per line.
+    :param paths: list of file paths or '-'
+    :return: list of (name, input_parameters)
+    """
+    inputs = []
+    for path in paths:
+        if path == '-':
+            content = sys.stdin.read()
+            try:
+                parsed = json.loads(content)
+            except json.JSONDecodeError:
+                parsed = [json.loads(line) for line in content.splitlines() if line.strip()]
+            parsed = parsed if isinstance(parsed, list) else [parsed]
+            inputs.extend((f"stdin[{index}]", input_parameters) for index, input_parameters in enumerate(parsed))
+        else:
+            with open(path, "r") as file:
+                inputs.append((path, json.load(file)))
+    return inputs
+
+
+def solve_input(name: str, input_parameters: Dict, mode_shapes: bool = False, cache_dir: str = None,
+                stats: bool = False, trace_memory: bool = False, frf_points: int = 0, static: bool = False,
+                load_cases=None) -> Dict:
+    """
+    Solves one input and converts the solution to a JSON serializable Dict
+    :param name: name of the input, e.g. the file path
+    :param input_parameters: Dict with the six input dicts
+    :param mode_shapes: include the deformed node coordinates of every mode
+    :param cache_dir: optional directory of a cache.ResultCache
+    :param stats: include the per-stage stats of the calculation, see Calculation.stats
+    :param trace_memory: include the peak memory of each stage in the stats
+    :param frf_points: include the frequency response of the tower head at this number of frequencies around
+                       f_excite and f_rotor, see frequencyresponse.frequency_response (0: no frequency response)
+    :param static: include the static head displacements and base reactions, see Calculation.solve_static
+    :param load_cases: list of (f_head, m_head) of the static load cases, defaults to f_head and m_head of the input
+    :return: Dict with name, eigenfreqs, solver (None if cached), optional stats (None if cached), optional
+             mode_shapes, optional frf (or frf_error if only the frequency response failed, e.g. without excitation
+             frequencies) and optional static, or name and error
+    """
+    try:
+        cache = ResultCache(cache_dir) if cache_dir else None
+        calculation = Calculation(*[input_parameters[key] for key in INPUT_KEYS], cache=cache, instrument=stats,
+                                  trace_memory=trace_memory)
+        solution = calculation.return_solution()
+        response = frf_error = None
+        if frf_points:
+            try:
+                response = frequency_response(calculation, excitation_frequencies(calculation.forces, frf_points))
+            except ValueError as error:
+                frf_error = f"{type(error).__name__}: {error}"
+        static_result = None
+        if static:
+            f_head, m_head = np.array(load_cases, dtype=np.float64).T if load_cases else (None, None)
+            static_result = calculation.solve_static(f_head, m_head)
+    except Exception as error:
+        return {'name': name, 'error': f"{type(error).__name__}: {error}"}
+    result = {'name': name,
+              'eigenfreqs': solution.eigenfreqs.tolist(),
+              'solver': solver_metadata(calculation.solver_info)}
+    if stats or trace_memory:
+        result['stats'] = calculation.stats or None
+    if mode_shapes:
+        result['mode_shapes'] = [solution.deformed(mode).tolist() for mode in solution]
+    if response is not None:
+        result['frf'] = {'frequencies': response['frequencies'].tolist(),
+                         'amplitude': response['amplitude'][:, 0].tolist(),
+                         'phase': response['phase'][:, 0].tolist()}
+    if frf_error is not None:
+        result['frf_error'] = frf_error
+    if static_result is not None:
+        result['static'] = {'load_cases': load_cases,
+                            'head_displacements': static_result['displacements'][:, 0].tolist(),
+                            'base_reactions': static_result['base_reactions'].tolist()}
+    return result
+
+
+def _solve_input_args(args):
+    return solve_input(*args)
+
+
+def solve_inputs(inputs, jobs: int = None, mode_shapes: bool = False, cache_dir: str = None, stats: bool = False,
+                 trace_memory: bool = False, frf_points: int = 0, static: bool = False, load_cases=None):
+    """
+    Solves the inputs in parallel, results are yielded in input order as soon as they are available
+    :param inputs: list of (name, input_parameters)
+    :param jobs: number of worker processes, defaults to the number of CPUs. 1 solves in this process.
+    :param mode_shapes: include the deformed node coordinates of every mode
+    :param cache_dir: optional directory of a cache.ResultCache
+    :param stats: include the per-stage stats of the calculation
+    :param trace_memory: include the peak memory of each stage in the stats
+    :param frf_points: number of frequencies of the frequency response of the tower head (0: none)
+    :param static: include the static solution of the load cases
+    :param load_cases: list of (f_head, m_head), defaults to the head loads of each input
+    :return: generator of result Dicts, see solve_input
+    """
+    tasks = [(name, input_parameters, mode_shapes, cache_dir, stats, trace_memory, frf_points, static, load_cases)
+             for name, input_parameters in inputs]
+    jobs = min(jobs or os.cpu_count() or 1, max(len(tasks), 1))
+    if jobs == 1:
+        yield from map(_solve_input_args, tasks)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            yield from executor.map(_solve_input_args, tasks)
+
+
+def write_results(results, file, output_format: str):
+    """
+    Writes the results as one JSON document {'results': [...]} or as JSON lines (one result per line, streamed)
+    :param results: iterable of result Dicts
+    :param file: writable text file
+    :param output_format: 'json' or 'jsonl'
+    :return: number of failed inputs
+    """
+    failed = 0
+    if output_format == 'jsonl':
+        for result in results:
+            failed += 'error' in result
+            file.write(json.dumps(result) + '\n')
+            file.flush()
+    else:
+        results = list(results)
+        failed = sum('error' in result for result in results)
+        json.dump({'results': results}, file)
+        file.write('\n')
+    return failed
+
+
+def main(argv=None):
+    """
+    Command line entry point
+    :param argv: command line arguments, defaults to sys.argv[1:]
+    :return: exit code, 1 if any input failed
+    """
+    parser = argparse.ArgumentParser(description="WindForce batch calculation")
+    parser.add_argument('inputs', nargs='+', help="input JSON files, '-' reads from stdin")
+    parser.add_argument('-o', '--output', default='-', help="output file, '-' writes to stdout (default)")
+    parser.add_argument('-f', '--format', choices=('json', 'jsonl'), default='json', dest='output_format',
+                        help="one JSON document or one JSON line per input (default: json)")
+    parser.add_argument('-j', '--jobs', type=int, default=None, help="number of worker processes (default: CPUs)")
+    parser.add_argument('--mode-shapes', action='store_true', help="include the mode shapes in the output")
+    parser.add_argument('--cache-dir', default=None, help="reuse results of equal inputs from this cache directory")
+    parser.add_argument('--stats', action='store_true', help="include time and stage values of each calculation stage")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="include the peak memory of each calculation stage (implies --stats, slower)")
+    parser.add_argument('--frf', type=int, default=0, metavar='POINTS', dest='frf_points',
+                        help="include amplitude and phase of the tower head DOFs at this number of frequencies "
+                             "around f_excite and f_rotor")
+    parser.add_argument('--static', action='store_true',
+                        help="include the static head displacements and base reactions of the head loads")
+    parser.add_argument('--load-case', nargs=2, type=float, action='append', metavar=('F_HEAD', 'M_HEAD'),
+                        dest='load_cases', help="static load case, may be given several times (implies --static, "
+                                                "default: f_head and m_head of each input)")
+    args = parser.parse_args(argv)
+
+    results = solve_inputs(read_inputs(args.inputs), jobs=args.jobs, mode_shapes=args.mode_shapes,
+                           cache_dir=args.cache_dir, stats=args.stats, trace_memory=args.trace_memory,
+                           frf_points=args.frf_points, static=args.static or bool(args.load_cases),
+                           load_cases=args.load_cases)
+    if args.output == '-':
+        failed = write_results(results, sys.stdout, args.output_format)
+    else:
+        with open(args.output, "w") as file:
+            failed = write_results(results, file, args.output_format)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
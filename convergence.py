@@ -0,0 +1,140 @@
+"""
+#######################################################################
+LICENSE INFORMATION
+This file is part of Windforce.
+
+Windforce is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Windforce is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Windforce. If not, see <https://www.gnu.org/licenses/>.
+#######################################################################
+
+#######################################################################
+Description:
+Mesh convergence of the eigenfrequencies in fem_density. The model is solved at increasing densities (each level
+refines the previous one by a constant ratio r, the modes of the coarser level warm-start the eigensolver) until the
+relative change of the requested eigenfrequencies drops below a tolerance. With the element length h the
+eigenfrequencies converge as f(h) = f* + C h^p, the Richardson extrapolation of the last levels
+    f* = f_i + (f_i - f_i-1) / (r^p - 1)
+estimates the converged eigenfrequencies f* and the discretization error |f* - f_i| of the finest level. The order
+p is estimated from the last three levels, it defaults to DEFAULT_ORDER if fewer levels were solved or the
+estimate is not meaningful.
+#######################################################################
+"""
+
+import copy
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict
+import numpy as np
+from calculation import Calculation
+from sweep import INPUT_KEYS
+
+DEFAULT_TOLERANCE = 1e-3
+DEFAULT_MAX_DENSITY = 64
+# Assumed order of convergence of the eigenfrequencies, the cross-section values are constant per element, so the
+# geometry of tapered sections converges with h^2
+DEFAULT_ORDER = 2.
+
+
+def richardson_extrapolation(eigenfreqs, ratio: float):
+    """
+    Extrapolates the eigenfrequencies of successively refined meshes
+    :param eigenfreqs: eigenfrequencies of at least two levels, shape (levels, modes)
+    :param ratio: refinement ratio of the element length between the levels
+    :return: extrapolated eigenfrequencies, estimated errors of the finest level, orders of convergence (modes,)
+    """
+    eigenfreqs = np.asarray(eigenfreqs, dtype=np.float64)
+    finest, change = eigenfreqs[-1], eigenfreqs[-1] - eigenfreqs[-2]
+    order = np.full(finest.size, DEFAULT_ORDER)
+    if len(eigenfreqs) >= 3:
+        previous_change = eigenfreqs[-2] - eigenfreqs[-3]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            estimated = np.log(previous_change / change) / math.log(ratio)
+        # Only monotone convergence gives a meaningful order
+        meaningful = np.isfinite(estimated) & (estimated > 0.5)
+        order[meaningful] = estimated[meaningful]
+    extrapolated = finest + change / (ratio ** order - 1)
+    return extrapolated, np.abs(extrapolated - finest), order
+
+
+def converge_density(input_parameters: Dict, tolerance: float = DEFAULT_TOLERANCE, start_density: int = None,
+                     ratio: int = 2, max_density: int = DEFAULT_MAX_DENSITY, num_modes: int = None) -> Dict:
+    """
+    Solves the model at increasing fem_density until the eigenfrequencies converge
+    :param input_parameters: Dict with the six input dicts
+    :param tolerance: max. relative change of the eigenfrequencies between the last two levels
+    :param start_density: fem_density of the coarsest level, defaults to calculation_param['fem_density']
+    :param ratio: factor of fem_density between two levels
+    :param max_density: the refinement stops at this fem_density, even if the eigenfrequencies did not converge
+    :param num_modes: number of the lowest modes to check, defaults to all computed modes
+    :return: Dict with densities, eigenfreqs (levels, modes) and the relative change of each level (NaN for the
+             first level), converged, the extrapolated eigenfreqs, errors and orders (see richardson_extrapolation,
+             None if only one level was solved) and the calculation of the finest level
+    """
+    input_parameters = copy.deepcopy(input_parameters)
+    calculation_param = input_parameters['calculation_param']
+    density = start_density or calculation_param['fem_density']
+    calculation_param['fem_density'] = density
+    calculation = Calculation(*[input_parameters[key] for key in INPUT_KEYS])
+    calculation.start_calc()
+    densities = [density]
+    eigenfreqs = [calculation.solution.eigenfreqs[:num_modes]]
+    changes = [np.nan]
+    converged = False
+    while density * ratio <= max_density:
+        density *= ratio
+        calculation_param = {**calculation_param, 'fem_density': density}
+        input_parameters['calculation_param'] = calculation_param
+        # The mesh changes, update rebuilds the model and interpolates the previous modes as start vectors
+        solution = calculation.update(*[input_parameters[key] for key in INPUT_KEYS])
+        densities.append(density)
+        eigenfreqs.append(solution.eigenfreqs[:num_modes])
+        changes.append(float(np.max(np.abs(eigenfreqs[-1] - eigenfreqs[-2]) / eigenfreqs[-1])))
+        if changes[-1] < tolerance:
+            converged = True
+            break
+
+    eigenfreqs = np.array(eigenfreqs)
+    extrapolated, errors, orders = richardson_extrapolation(eigenfreqs, ratio) if len(eigenfreqs) > 1 \
+        else (None, None, None)
+    return {'densities': densities,
+            'eigenfreqs': eigenfreqs,
+            'changes': np.array(changes),
+            'converged': converged,
+            'extrapolated': extrapolated,
+            'errors': errors,
+            'orders': orders,
+            'calculation': calculation}
+
+
+def _converge_density_args(args):
+    result = converge_density(*args)
+    del result['calculation']
+    return result
+
+
+def converge_batch(inputs, processes: int = None, tolerance: float = DEFAULT_TOLERANCE, start_density: int = None,
+                   ratio: int = 2, max_density: int = DEFAULT_MAX_DENSITY, num_modes: int = None):
+    """
+    Runs converge_density for every input in a process pool
+    :param inputs: list of Dicts with the six input dicts
+    :param processes: number of worker processes, defaults to the number of CPUs. 1 runs in this process.
+    :return: list of result Dicts of converge_density without the calculation, in input order
+    """
+    tasks = [(input_parameters, tolerance, start_density, ratio, max_density, num_modes)
+             for input_parameters in inputs]
+    processes = min(processes or os.cpu_count() or 1, max(len(tasks), 1))
+    if processes == 1:
+        return list(map(_converge_density_args, tasks))
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return list(executor.map(_converge_density_args, tasks))
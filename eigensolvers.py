@@ -0,0 +1,331 @@
+"""
+#######################################################################
+LICENSE INFORMATION
+This file is part of Windforce.
+
+Windforce is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Windforce is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Windforce. If not, see <https://www.gnu.org/licenses/>.
+#######################################################################
+
+#######################################################################
+Description:
+Eigensolver backends for the generalized eigenvalue problem K x = lambda M x
+#######################################################################
+"""
+
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import numpy as np
+from scipy.linalg import cho_solve_banded, cholesky_banded, eigh
+from scipy.sparse import diags_array
+from scipy.sparse.linalg import eigsh, lobpcg, splu, LinearOperator
+
+# Models up to this number of DOFs are solved with the dense solver if the solver is chosen automatically
+DENSE_MAX_DOFS = 500
+# Larger models with at most this half-bandwidth are solved with the banded solver if the solver is chosen
+# automatically (the tower chain has a half-bandwidth of 11)
+BANDED_MAX_BANDWIDTH = 64
+# Max. relative residual of a returned eigenpair, see eigen_residuals
+RESIDUAL_TOLERANCE = 1e-2
+# A residual up to this multiple of its rounding floor (see eigen_residuals) is the accuracy limit of K in double
+# precision, e.g. on very fine meshes. Another solver cannot reduce it, the eigenpairs are returned with a warning.
+ROUNDING_FACTOR = 10
+
+
+def half_bandwidth(matrix):
+    """
+    :param matrix: sparse matrix in CSR format
+    :return: max. |i - j| of the stored entries
+    """
+    rows = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+    return int(np.max(np.abs(rows - matrix.indices), initial=0))
+
+
+def to_banded(matrix, bandwidth: int):
+    """
+    Converts a symmetric sparse matrix to LAPACK upper banded storage, ab[bandwidth + i - j, j] = a[i, j] for i <= j
+    :param matrix: symmetric sparse matrix in CSR format
+    :param bandwidth: half-bandwidth, see half_bandwidth
+    :return: array of shape (bandwidth + 1, n)
+    """
+    rows = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+    upper = rows <= matrix.indices
+    banded = np.zeros((bandwidth + 1, matrix.shape[0]), dtype=np.float64)
+    np.add.at(banded, (bandwidth + rows[upper] - matrix.indices[upper], matrix.indices[upper]), matrix.data[upper])
+    return banded
+
+
+def factorize(k_glob, method: str = 'auto'):
+    """
+    Factorizes the stiffness matrix once for repeated solves
+    :param k_glob: symmetric positive definite stiffness matrix (sparse)
+    :param method: 'banded_cholesky' (LAPACK pbtrf, memory and time O(n) for a fixed bandwidth, e.g. for the chain
+                   of tower elements), 'splu' (sparse LU decomposition) or 'auto': banded_cholesky if the
+                   half-bandwidth is at most BANDED_MAX_BANDWIDTH, otherwise splu
+    :return: function solving K x = b for b of shape (n,) or (n, number of right-hand sides), name of the method
+    """
+    k_glob = k_glob.tocsr()
+    bandwidth = half_bandwidth(k_glob) if method != 'splu' else None
+    if method == 'auto':
+        method = 'banded_cholesky' if bandwidth <= BANDED_MAX_BANDWIDTH else 'splu'
+    if method == 'banded_cholesky':
+        k_cholesky = cholesky_banded(to_banded(k_glob, bandwidth), check_finite=False)
+        return (lambda b: cho_solve_banded((k_cholesky, False), b, check_finite=False)), method
+    if method == 'splu':
+        return splu(k_glob.tocsc()).solve, method
+    raise ValueError(f"unknown factorization '{method}', choose 'auto', 'banded_cholesky' or 'splu'")
+
+
+def solve_shift_invert(k_glob, m_glob, nbr_eigen_freq, initial_vectors=None, factorization: str = 'splu'):
+    """
+    Lanczos (ARPACK) in shift-invert mode around sigma=0, K is factorized once (see factorize)
+    :param k_glob: stiffness matrix (sparse)
+    :param m_glob: mass matrix (sparse)
+    :param nbr_eigen_freq: number of eigenvalues
+    :param initial_vectors: optional approximate eigenvectors (columns), their sum is the ARPACK start vector
+    :param factorization: factorization of K, see factorize
+    :return: eigenvalues, eigenvectors, number of iterations (applications of the inverse)
+    """
+    solve, _ = factorize(k_glob, factorization)
+    iterations = [0]
+
+    def apply_inverse(x):
+        iterations[0] += 1
+        return solve(x)
+
+    op_inv = LinearOperator(k_glob.shape, matvec=apply_inverse, dtype=np.float64)
+    v0 = None if initial_vectors is None else initial_vectors.sum(axis=1)
+    eigenvalues, eigenvectors = eigsh(k_glob, k=nbr_eigen_freq, M=m_glob, sigma=0, which='LM', OPinv=op_inv,
+                                      v0=v0)
+    return eigenvalues, eigenvectors, iterations[0]
+
+
+def solve_lobpcg(k_glob, m_glob, nbr_eigen_freq, initial_vectors=None):
+    """
+    LOBPCG preconditioned with the sparse LU factorization of K
+    :param k_glob: stiffness matrix (sparse)
+    :param m_glob: mass matrix (sparse)
+    :param nbr_eigen_freq: number of eigenvalues
+    :param initial_vectors: optional approximate eigenvectors (columns) as initial block, missing columns are random
+    :return: eigenvalues, eigenvectors, number of iterations
+    """
+    # Symmetric diagonal scaling balances the very different stiffness magnitudes (e.g. a stiff excentricity arm)
+    diagonal_sqrt = np.sqrt(np.abs(k_glob.diagonal()))
+    scaling = diags_array(1 / diagonal_sqrt)
+    k_scaled = (scaling @ k_glob @ scaling).tocsc()
+    m_scaled = scaling @ m_glob @ scaling
+    lu = splu(k_scaled)
+    preconditioner = LinearOperator(k_glob.shape, matvec=lu.solve, matmat=lu.solve, dtype=np.float64)
+    x = np.random.default_rng(0).standard_normal((k_glob.shape[0], nbr_eigen_freq))
+    if initial_vectors is not None:
+        # M-orthonormalize the start vectors, (nearly) linearly dependent ones are dropped and replaced by random ones
+        initial_scaled = initial_vectors[:, :nbr_eigen_freq] * diagonal_sqrt[:, np.newaxis]
+        gram_values, gram_vectors = eigh(initial_scaled.T @ (m_scaled @ initial_scaled))
+        independent = gram_values > 1e-10 * np.max(gram_values, initial=0)
+        num_initial = np.count_nonzero(independent)
+        x[:, :num_initial] = initial_scaled @ (gram_vectors[:, independent] / np.sqrt(gram_values[independent]))
+    eigenvalues, eigenvectors, residual_history = lobpcg(k_scaled, x, B=m_scaled, M=preconditioner, largest=False,
+                                                         tol=1e-6, maxiter=200, retResidualNormsHistory=True)
+    eigenvectors = scaling @ eigenvectors
+    return eigenvalues, eigenvectors, len(residual_history)
+
+
+def solve_dense(k_glob, m_glob, nbr_eigen_freq, initial_vectors=None):
+    """
+    Dense LAPACK solver for small models, only the requested lowest eigenvalues are computed.
+    The inverted problem M x = 1/lambda K x is solved since K is far better conditioned than M
+    (e.g. a stiff, light excentricity arm)
+    :param k_glob: stiffness matrix (sparse)
+    :param m_glob: mass matrix (sparse)
+    :param nbr_eigen_freq: number of eigenvalues
+    :param initial_vectors: ignored, the dense solver cannot be warm-started
+    :return: eigenvalues, eigenvectors, number of iterations (None)
+    """
+    num_dofs = k_glob.shape[0]
+    inverse_eigenvalues, eigenvectors = eigh(m_glob.toarray(), k_glob.toarray(),
+                                             subset_by_index=[num_dofs - min(nbr_eigen_freq, num_dofs), num_dofs - 1])
+    # Normalize eigenvectors with respect to M
+    eigenvectors = eigenvectors / np.sqrt(np.sum(eigenvectors * (m_glob @ eigenvectors), axis=0))
+    return 1 / inverse_eigenvalues, eigenvectors, None
+
+
+# 'shift_invert' and 'banded' differ in the factorization of K only
+EIGEN_SOLVERS = {'shift_invert': partial(solve_shift_invert, factorization='splu'),
+                 'banded': partial(solve_shift_invert, factorization='banded_cholesky'),
+                 'lobpcg': solve_lobpcg,
+                 'dense': solve_dense}
+
+
+def eigen_residuals(k_glob, m_glob, eigenvalues, eigenvectors):
+    """
+    Relative residuals ||K x - lambda M x|| / (|lambda| ||M x||) of eigenpairs, each scaled by its own eigenvalue,
+    and their rounding floors eps ||K|| ||x|| / (|lambda| ||M x||), i.e. the residual of an exact eigenpair in double
+    precision. The floor grows with the condition of K, it reaches 1e-2 for the lowest modes at about 3000 tower
+    elements.
+    :param k_glob: stiffness matrix (sparse)
+    :param m_glob: mass matrix (sparse)
+    :param eigenvalues: eigenvalues of shape (n_modes,)
+    :param eigenvectors: eigenvectors (columns)
+    :return: residuals and rounding floors, each of shape (n_modes,)
+    """
+    m_x = m_glob @ eigenvectors
+    scale = np.abs(eigenvalues) * np.linalg.norm(m_x, axis=0)
+    residuals = np.linalg.norm(k_glob @ eigenvectors - m_x * eigenvalues, axis=0) / scale
+    k_norm = abs(k_glob).sum(axis=1).max()
+    return residuals, np.finfo(np.float64).eps * k_norm * np.linalg.norm(eigenvectors, axis=0) / scale
+
+
+def select_solver(solver, num_dofs, nbr_eigen_freq, bandwidth=None):
+    """
+    Returns the name of the solver to use, 'auto' chooses from the number of DOFs and the half-bandwidth. LOBPCG is
+    replaced by the dense solver if the block of eigenvectors is close to the problem size.
+    :param solver: 'auto' or a key of EIGEN_SOLVERS
+    :param num_dofs: number of DOFs of the eigenvalue problem
+    :param nbr_eigen_freq: number of eigenvalues
+    :param bandwidth: optional half-bandwidth of the matrices, see half_bandwidth
+    :return:
+    """
+    if solver == 'auto':
+        # ARPACK needs nbr_eigen_freq < num_dofs, small models are solved dense anyway
+        if num_dofs <= DENSE_MAX_DOFS or nbr_eigen_freq >= num_dofs - 1:
+            return 'dense'
+        if bandwidth is not None and bandwidth <= BANDED_MAX_BANDWIDTH:
+            return 'banded'
+        return 'shift_invert'
+    if solver not in EIGEN_SOLVERS:
+        raise ValueError(f"unknown solver '{solver}', choose 'auto' or one of {sorted(EIGEN_SOLVERS)}")
+    if solver == 'lobpcg' and num_dofs < 5 * nbr_eigen_freq:
+        return 'dense'
+    return solver
+
+
+def solve_eigen(k_glob, m_glob, nbr_eigen_freq, solver='auto', initial_vectors=None):
+    """
+    Solves the generalized eigenvalue problem for the lowest eigenvalues with the selected backend
+    :param k_glob: stiffness matrix (sparse)
+    :param m_glob: mass matrix (sparse)
+    :param nbr_eigen_freq: number of eigenvalues
+    :param solver: 'auto' or a key of EIGEN_SOLVERS
+    :param initial_vectors: optional approximate eigenvectors (columns) to warm-start the iterative solvers, e.g. the
+                            eigenvectors of a slightly different model. Ignored if the number of DOFs differs.
+    :return: ascending eigenvalues, M-normalized eigenvectors (columns), Dict with solver information:
+             solver, time [s], iterations, residual_norms (see eigen_residuals), warm_start (initial vectors were
+             passed to an iterative solver), attempts (number of solves), converged (all residuals are below
+             RESIDUAL_TOLERANCE)
+    :raises RuntimeError: if the eigenpairs do not converge, see RESIDUAL_TOLERANCE. A failed warm-started solve is
+                          first repeated without start vectors, a failed iterative solve with the shift-invert
+                          solver. Residuals at their rounding floor (see ROUNDING_FACTOR) only give a RuntimeWarning.
+    """
+    bandwidth = half_bandwidth(k_glob.tocsr()) if solver == 'auto' else None
+    solver = select_solver(solver, k_glob.shape[0], nbr_eigen_freq, bandwidth)
+    if initial_vectors is not None and initial_vectors.shape[0] != k_glob.shape[0]:
+        initial_vectors = None
+    attempts = [(solver, initial_vectors)]
+    if solver != 'dense':
+        if initial_vectors is not None:
+            attempts.append((solver, None))
+        if solver != 'shift_invert':
+            attempts.append(('shift_invert', None))
+    start = time.perf_counter()
+    for attempt, (solver, initial_vectors) in enumerate(attempts, 1):
+        eigenvalues, eigenvectors, iterations = EIGEN_SOLVERS[solver](k_glob, m_glob, nbr_eigen_freq,
+                                                                      initial_vectors)
+        residual_norms, residual_floors = eigen_residuals(k_glob, m_glob, eigenvalues, eigenvectors)
+        failed = residual_norms > RESIDUAL_TOLERANCE
+        if not failed.any():
+            break
+        if np.all(residual_norms[failed] <= ROUNDING_FACTOR * residual_floors[failed]):
+            warnings.warn(f"the stiffness matrix is too badly conditioned to solve the eigenvalue problem accurately "
+                          f"(max. relative residual {np.max(residual_norms):.2e}), the eigenfrequencies may be "
+                          f"inaccurate, reduce fem_density", RuntimeWarning)
+            break
+    else:
+        raise RuntimeError(f"the eigenpairs did not converge, max. relative residual {np.max(residual_norms):.2e}")
+    solve_time = time.perf_counter() - start
+    order = np.argsort(eigenvalues)
+    solver_info = {'solver': solver, 'time': solve_time, 'iterations': iterations,
+                   'residual_norms': residual_norms[order],
+                   'warm_start': initial_vectors is not None and solver != 'dense', 'attempts': attempt,
+                   'converged': not failed.any()}
+    return eigenvalues[order], eigenvectors[:, order], solver_info
+
+
+def solve_eigen_blocks(k_glob, m_glob, nbr_eigen_freq, blocks, solver='auto', initial_vectors=None):
+    """
+    Solves a generalized eigenvalue problem whose matrices are block diagonal (after permutation) as independent
+    sub-problems in parallel threads. A block may have copies, i.e. other DOFs whose matrices are equal up to the sign
+    of some DOFs: the block is only solved once and its modes are reported once per copy (degenerate modes).
+    :param k_glob: stiffness matrix (sparse)
+    :param m_glob: mass matrix (sparse)
+    :param nbr_eigen_freq: number of eigenvalues
+    :param blocks: list of Dicts with 'dofs' (indices of the block) and optional 'copies' (list of (dofs, signs))
+    :param solver: 'auto' or a key of EIGEN_SOLVERS, applied to each block
+    :param initial_vectors: optional approximate eigenvectors (columns) of the whole problem, see solve_eigen
+    :return: see solve_eigen, solver_info additionally contains 'blocks' with solver, time, iterations, num_dofs and
+             num_copies of each block
+    """
+    k_glob = k_glob.tocsr()
+    m_glob = m_glob.tocsr()
+    num_dofs = k_glob.shape[0]
+    if initial_vectors is not None and initial_vectors.shape[0] != num_dofs:
+        initial_vectors = None
+
+    def solve_block(block):
+        dofs = block['dofs']
+        num_copies = 1 + len(block.get('copies', ()))
+        block_nbr_eigen_freq = min(-(-nbr_eigen_freq // num_copies), dofs.size)
+        block_initial_vectors = None
+        if initial_vectors is not None:
+            # Only previous modes of this block are useful start vectors
+            block_initial_vectors = initial_vectors[dofs]
+            norms = np.linalg.norm(block_initial_vectors, axis=0)
+            block_initial_vectors = block_initial_vectors[:, norms > 1e-8 * np.max(norms, initial=0)]
+            if block_initial_vectors.shape[1] == 0:
+                block_initial_vectors = None
+        block_solver = 'dense' if block_nbr_eigen_freq >= dofs.size - 1 else solver
+        return solve_eigen(k_glob[dofs][:, dofs], m_glob[dofs][:, dofs], block_nbr_eigen_freq, block_solver,
+                           block_initial_vectors)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(blocks)) as executor:
+        block_results = list(executor.map(solve_block, blocks))
+    solve_time = time.perf_counter() - start
+
+    # Merge the modes of all blocks and their copies, equal eigenvalues keep the order block, copies
+    eigenvalues = []
+    eigenvectors = []
+    residual_norms = []
+    for block, (block_eigenvalues, block_eigenvectors, block_info) in zip(blocks, block_results):
+        for dofs, signs in [(block['dofs'], 1)] + list(block.get('copies', ())):
+            vectors = np.zeros((num_dofs, block_eigenvalues.size))
+            vectors[dofs] = block_eigenvectors * np.reshape(signs, (-1, 1))
+            eigenvalues.append(block_eigenvalues)
+            eigenvectors.append(vectors)
+            residual_norms.append(block_info['residual_norms'])
+    order = np.argsort(np.concatenate(eigenvalues), kind='stable')[:nbr_eigen_freq]
+    block_infos = [block_info for _, _, block_info in block_results]
+    iterations = [block_info['iterations'] for block_info in block_infos if block_info['iterations'] is not None]
+    solver_info = {'solver': '+'.join(dict.fromkeys(block_info['solver'] for block_info in block_infos)),
+                   'time': solve_time,
+                   'iterations': sum(iterations) if iterations else None,
+                   'residual_norms': np.concatenate(residual_norms)[order],
+                   'warm_start': any(block_info['warm_start'] for block_info in block_infos),
+                   'attempts': sum(block_info['attempts'] for block_info in block_infos),
+                   'converged': all(block_info['converged'] for block_info in block_infos),
+                   'blocks': [{'solver': block_info['solver'], 'time': block_info['time'],
+                               'iterations': block_info['iterations'], 'num_dofs': int(block['dofs'].size),
+                               'num_copies': len(block.get('copies', ()))}
+                              for block, block_info in zip(blocks, block_infos)]}
+    return np.concatenate(eigenvalues)[order], np.hstack(eigenvectors)[:, order], solver_info
@@ -0,0 +1,132 @@
+"""
+#######################################################################
+LICENSE INFORMATION
+This file is part of Windforce.
+
+Windforce is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Windforce is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Windforce. If not, see <https://www.gnu.org/licenses/>.
+#######################################################################
+
+#######################################################################
+Description:
+Harmonic frequency response of the head loads of the forces input. The modal path superposes the computed modes
+with the modal damping ratio calculation_param['fem_dmas'],
+    u(f) = sum_r phi_r phi_r^T F / (omega_r^2 - Omega^2 + 2 i zeta omega_r Omega),    Omega = 2 pi f
+evaluated for all frequencies in one broadcasted computation. The direct path solves the full sparse system per
+frequency with the same damping and serves as accuracy check of the modal truncation.
+#######################################################################
+"""
+
+import math
+from typing import Dict
+import numpy as np
+from scipy.sparse.linalg import splu
+
+DEFAULT_NUM_FREQUENCIES = 2000
+
+
+def excitation_frequencies(forces: Dict, num: int = DEFAULT_NUM_FREQUENCIES, relative_width: float = 0.5):
+    """
+    Frequency grid around the excitation frequencies f_excite and f_rotor of the forces input, the points are split
+    evenly between the given (greater than 0) frequencies
+    :param forces: forces input, see ABCCalculation
+    :param num: total number of frequencies
+    :param relative_width: the grid of a frequency f spans f * (1 -+ relative_width)
+    :return: sorted unique frequencies [Hz]
+    """
+    centers = [forces.get(key, 0) for key in ('f_excite', 'f_rotor') if forces.get(key, 0) > 0]
+    if not centers:
+        raise ValueError("the frequency grid needs f_excite or f_rotor greater than 0")
+    num_per_center = max(num // len(centers), 2)
+    return np.unique(np.concatenate([np.linspace(center * (1 - relative_width), center * (1 + relative_width),
+                                                 num_per_center) for center in centers]))
+
+
+def modal_transfer(omega, damping: float, frequencies):
+    """
+    :param omega: circular eigenfrequencies [rad/s], shape (n_modes,)
+    :param damping: modal damping ratio []
+    :param frequencies: excitation frequencies [Hz], shape (n_freqs,)
+    :return: complex modal receptances of shape (n_freqs, n_modes)
+    """
+    excitation = 2 * math.pi * np.asarray(frequencies, dtype=np.float64)[:, np.newaxis]
+    return 1 / (omega ** 2 - excitation ** 2 + 2j * damping * omega * excitation)
+
+
+def output_dofs(calculation, nodes=None):
+    """
+    :param calculation: calculation.Calculation
+    :param nodes: indices of the output nodes, defaults to the tower head (see mesh.Mesh.head_node)
+    :return: node indices, indices of the output DOFs into the free DOFs (-1 for constrained DOFs) of shape
+             (n_nodes * 6,)
+    """
+    nodes = np.atleast_1d(calculation.mesh.head_node if nodes is None else np.asarray(nodes))
+    return nodes, calculation.dof_map[(6 * nodes[:, np.newaxis] + np.arange(6)).ravel()]
+
+
+def frequency_response(calculation, frequencies=None, nodes=None, method: str = 'modal') -> Dict:
+    """
+    Calculates the steady state response of the output nodes to the harmonic head loads (see
+    Calculation.calc_head_load)
+    :param calculation: calculation.Calculation, solved if necessary (see Calculation.modal_basis)
+    :param frequencies: excitation frequencies [Hz], defaults to excitation_frequencies(calculation.forces)
+    :param nodes: indices of the output nodes, defaults to the tower head (see mesh.Mesh.head_node)
+    :param method: 'modal' (all frequencies at once) or 'direct' (one sparse solve per frequency, for checking)
+    :return: Dict with frequencies [Hz] of shape (n_freqs,), nodes, amplitude [m], [rad] and phase [rad] of shape
+             (n_freqs, n_nodes, 6). The phase is the lag of the displacement behind the load.
+    """
+    omega, eigenvectors = calculation.modal_basis()
+    frequencies = excitation_frequencies(calculation.forces) if frequencies is None \
+        else np.atleast_1d(np.asarray(frequencies, dtype=np.float64))
+    nodes, dofs = output_dofs(calculation, nodes)
+    free = dofs >= 0
+    damping = calculation.calculation_param['fem_dmas']
+    load = calculation.calc_head_load()
+    response = np.zeros((frequencies.size, dofs.size), dtype=np.complex128)
+    if method == 'modal':
+        response[:, free] = (modal_transfer(omega, damping, frequencies) * (eigenvectors.T @ load)) \
+            @ eigenvectors[dofs[free]].T
+    elif method == 'direct':
+        response[:, free] = direct_response(calculation.k_glob, calculation.m_glob, omega, eigenvectors, damping,
+                                            load, frequencies)[:, dofs[free]]
+    else:
+        raise ValueError(f"unknown method '{method}', choose 'modal' or 'direct'")
+    response = response.reshape(frequencies.size, nodes.size, 6)
+    return {'frequencies': frequencies, 'nodes': nodes, 'amplitude': np.abs(response), 'phase': -np.angle(response)}
+
+
+def direct_response(k, m, omega, eigenvectors, damping: float, load, frequencies):
+    """
+    Solves (K - Omega^2 M + i Omega C) u = F per frequency. The damping matrix C = M Phi diag(2 zeta omega) Phi^T M
+    is the modal damping of the computed modes, it is applied with the Woodbury identity so that only the real sparse
+    matrix K - Omega^2 M is factorized.
+    :param k: stiffness matrix of the free DOFs
+    :param m: mass matrix of the free DOFs
+    :param omega: circular eigenfrequencies [rad/s]
+    :param eigenvectors: M-normalized eigenvectors of the free DOFs
+    :param damping: modal damping ratio []
+    :param load: load vector of the free DOFs
+    :param frequencies: excitation frequencies [Hz]
+    :return: complex displacements of the free DOFs of shape (n_freqs, n_free_dofs)
+    """
+    modal_mass = m @ eigenvectors
+    response = np.empty((len(frequencies), load.size), dtype=np.complex128)
+    for index, frequency in enumerate(frequencies):
+        excitation = 2 * math.pi * frequency
+        factor = splu((k - excitation ** 2 * m).tocsc())
+        static = factor.solve(load)
+        coupling = factor.solve(modal_mass)
+        modal_damping = 2j * damping * omega * excitation
+        capacitance = np.eye(omega.size) + (modal_mass.T @ coupling) * modal_damping
+        response[index] = static - coupling @ (modal_damping * np.linalg.solve(capacitance, modal_mass.T @ static))
+    return response
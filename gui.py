@@ -27,11 +27,15 @@ import tkinter as tk
 from PIL import Image, ImageTk
 import tkinter.font as tkFont
 import math
-from tkinter import filedialog
+from tkinter import filedialog, messagebox, ttk
 import numpy as np
 import copy
 import json
-from calculation import Calculation
+import queue
+import threading
+from cache import ResultCache
+from calculation import Calculation, CalculationCancelled
+from resultfile import write_result
 #################################################
 # Other
 AUTHOR = 'Elias Perras, Marius Mellmann'
@@ -56,6 +60,9 @@ class WindForceGUI(tk.Tk):
     STANDARD_FONT_1 = ('Arial', 12)
     STANDARD_FONT_2 = ('Arial', 7)
     STANDARD_FONT_BUTTON = ('Arial', 10)
+    PROGRESS_POLL_MS = 50
+    # Hex codes of the color channel values 0..255
+    COLOR_CHANNEL_HEX = np.array([f"{value:02X}" for value in range(256)])
 
     def __init__(self):
         """
@@ -64,6 +71,10 @@ class WindForceGUI(tk.Tk):
         super().__init__()
         self.init_main_window()
         self.solution = None
+        self.calculation_thread = None
+        # Calculation of the last successful run, re-solved incrementally after edits of the inputs
+        self.calculation = None
+        self.result_cache = ResultCache()
         self.input_parameters_init = {'sections': {'0': {'sec_number': 0,
                                                        'sec_height': 0,
                                                        'sec_ra_bot': 0,
@@ -598,128 +609,263 @@ class WindForceGUI(tk.Tk):
     def enter_calc_params(self):
         self.input_window_boiler('calculation_param', 'fem_density', 'fem_nbr_eigen_freq', 'fem_dmas', 'fem_exc')
 
-    def draw_solution(self, solution_nodes):
-
-        def get_color_from_position(point_x_position):
-            if point_x_position > 1:
-                point_x_position = 1
-            red = int(255 * point_x_position)
-            blue = int(255 * (1 - point_x_position))
-            green = 0
-            color_code = "#{:02X}{:02X}{:02X}".format(red, green, blue)
-
-            return color_code
-
-        self.canvas_solution.create_line(self.canvas_sol_w / 2, self.canvas_sol_h, self.canvas_sol_w / 2,
-                                         solution_nodes[-1][1],
-                                         fill='dark green', width=2)
-
-        for start_point, end_point in zip(solution_nodes[1:], solution_nodes[:-1]):
-            color_scale_factor = 8
-            normalized_position_start_x = (start_point[0] / self.canvas_sol_w + (
-                    self.canvas_sol_w / 2) / self.canvas_sol_w) / 2
-            normalized_position_end_x = (end_point[0] / self.canvas_sol_w + (
-                    self.canvas_sol_w / 2) / self.canvas_sol_w) / 2
-            if abs(0.5 - normalized_position_start_x) >= abs(0.5 - normalized_position_end_x):
-                color_code = get_color_from_position(abs(normalized_position_start_x - 0.5) * color_scale_factor)
-            else:
-                color_code = get_color_from_position(abs(normalized_position_end_x - 0.5) * color_scale_factor)
-
-            self.canvas_solution.create_line(start_point[0], start_point[1], end_point[0], end_point[1],
-                                             fill=color_code, width=6)
+    def draw_solution(self, canvas, line_items: list, solution_nodes, colors):
+        """
+        Draws a mode shape by moving and recoloring the canvas items of the previously shown mode
+        :param canvas: canvas of the FEM Solution window
+        :param line_items: ids of the center line and of the segment lines on canvas, items are appended if the mode
+                           has more segments than before and unused items are hidden
+        :param solution_nodes: transformed node coordinates of shape (n_nodes, 2), see transform_solution
+        :param colors: color codes of the segments, see solution_colors
+        :return:
+        """
+        num_segments = len(solution_nodes) - 1
+        while len(line_items) <= num_segments:
+            line_items.append(canvas.create_line(0, 0, 0, 0, width=6))
+
+        canvas.coords(line_items[0], self.canvas_sol_w / 2, self.canvas_sol_h, self.canvas_sol_w / 2,
+                      solution_nodes[-1, 1])
+        segments = np.hstack((solution_nodes[1:], solution_nodes[:-1])).tolist()
+        for item, segment, color in zip(line_items[1:], segments, colors.tolist()):
+            canvas.coords(item, *segment)
+            canvas.itemconfig(item, fill=color, state='normal')
+        for item in line_items[num_segments + 1:]:
+            canvas.itemconfig(item, state='hidden')
+
+    def solution_colors(self, solution_nodes):
+        """
+        Colors of the segments between consecutive nodes, from blue at the center line to red at a deflection of 1/8
+        of the canvas width. The end of a segment with the larger deflection determines its color.
+        :param solution_nodes: transformed node coordinates of shape (n_nodes, 2), see transform_solution
+        :return: color codes of shape (n_nodes - 1,)
+        """
+        color_scale_factor = 8
+        normalized_deflection = np.abs((solution_nodes[:, 0] / self.canvas_sol_w + 0.5) / 2 - 0.5)
+        position = np.minimum(np.maximum(normalized_deflection[1:], normalized_deflection[:-1]) * color_scale_factor,
+                              1)
+        red = WindForceGUI.COLOR_CHANNEL_HEX[(255 * position).astype(np.int64)]
+        blue = WindForceGUI.COLOR_CHANNEL_HEX[(255 * (1 - position)).astype(np.int64)]
+        return np.char.add(np.char.add('#', red), np.char.add('00', blue))
 
     def transform_solution(self, solution_nodes):
-        canvas_sol_w = self.canvas_sol_w
-        canvas_sol_h = self.canvas_sol_h
-
-        canvas_sol_w = math.floor(canvas_sol_w * 3 / 4)
-        canvas_sol_h = math.floor(canvas_sol_h * 3 / 4)
+        """
+        Scales a mode shape to the solution canvas
+        :param solution_nodes: node coordinates (x, z) of shape (n_nodes, 2)
+        :return: canvas coordinates of shape (n_nodes, 2)
+        """
+        canvas_sol_w = math.floor(self.canvas_sol_w * 3 / 4)
+        canvas_sol_h = math.floor(self.canvas_sol_h * 3 / 4)
 
-        sol_x = [p[0] for p in solution_nodes]
-        sol_y = [p[1] for p in solution_nodes]
-        min_x = min(sol_x)
-        max_x = max(sol_x)
-        min_y = min(sol_y)
-        max_y = max(sol_y)
-        dist_x = max_x - min_x
-        dist_y = max_y - min_y
+        dist_x, dist_y = np.ptp(solution_nodes, axis=0)
+        # A mode without horizontal deflection is drawn on the center line
+        dist_x = dist_x or 1.
 
-        solution_nodes_transformed = [[math.floor(elem[0] / dist_x * canvas_sol_w / 3 + self.canvas_sol_w / 2),
-                                       -elem[1] / dist_y * canvas_sol_h + self.canvas_sol_h] for elem in solution_nodes]
+        solution_nodes_transformed = np.empty_like(solution_nodes)
+        solution_nodes_transformed[:, 0] = np.floor(solution_nodes[:, 0] / dist_x * canvas_sol_w / 3 +
+                                                    self.canvas_sol_w / 2)
+        solution_nodes_transformed[:, 1] = -solution_nodes[:, 1] / dist_y * canvas_sol_h + self.canvas_sol_h
 
         return solution_nodes_transformed
 
-    def interpolate_list(self, node_list: list) -> list:
+    def decimate_solution(self, solution_nodes):
+        """
+        Reduces a mode shape to the points that are visible on the canvas. The chain of nodes is split into runs of
+        consecutive nodes in the same pixel row, of each run only the nodes with the min. and max. x are kept, so that
+        the drawing cost depends on the canvas height and not on the number of nodes.
+        :param solution_nodes: transformed node coordinates of shape (n_nodes, 2), see transform_solution
+        :return: kept node coordinates in chain order, shape (n_kept, 2) with n_kept <= 2 * runs + 2
+        """
+        num_nodes = len(solution_nodes)
+        rows = np.floor(solution_nodes[:, 1]).astype(np.int64)
+        run_starts = np.flatnonzero(np.concatenate(([True], rows[1:] != rows[:-1])))
+        if run_starts.size == num_nodes:
+            return solution_nodes
+        run_ids = np.repeat(np.arange(run_starts.size), np.diff(np.append(run_starts, num_nodes)))
+
+        x = solution_nodes[:, 0]
+        kept = [[0, num_nodes - 1]]
+        for run_extreme in (np.minimum.reduceat(x, run_starts), np.maximum.reduceat(x, run_starts)):
+            # First node of each run at its extreme
+            candidates = np.flatnonzero(x == run_extreme[run_ids])
+            kept.append(candidates[np.unique(run_ids[candidates], return_index=True)[1]])
+        return solution_nodes[np.unique(np.concatenate(kept))]
+
+    def interpolate_list(self, node_list):
         """
         interpolates between nodes for better visualization for lower resolution
-        :param node_list:
+        :param node_list: deformed node coordinates (x, y, z) of shape (n_nodes, 3)
+        :return: node coordinates (x, z) of shape (n_nodes, 2), at least 100 nodes
+        """
+        nodes = np.asarray(node_list, dtype=np.float64)
+        if len(nodes) < 100:
+            z_interpolation = np.linspace(nodes[:, 2].min(), nodes[:, 2].max(), num=100)
+            x_interpolation = np.interp(z_interpolation, nodes[:, 2], nodes[:, 0])
+            return np.column_stack((x_interpolation, z_interpolation))
+        else:
+            return nodes[:, [0, 2]]
+
+    def start_calculation(self):
+        """
+        Starts the calculation in a worker thread, the FEM Solution window is opened when the results arrive
+        :return:
+        """
+        if self.calculation_thread is not None and self.calculation_thread.is_alive():
+            return
+
+        # get calculation, the worker gets a copy so that inputs can be edited while it runs
+        input_parameters_calculation = copy.deepcopy([self.input_parameters['sections'],
+                                                      self.input_parameters['springs'],
+                                                      self.input_parameters['masses'],
+                                                      self.input_parameters['forces'],
+                                                      self.input_parameters['excentricity'],
+                                                      self.input_parameters['calculation_param']
+                                                      ])
+        self.calculation_queue = queue.Queue()
+        self.calculation_cancel = threading.Event()
+        self.open_progress_window()
+        self.calculation_thread = threading.Thread(target=self.run_calculation,
+                                                   args=(input_parameters_calculation, self.calculation_queue,
+                                                         self.calculation_cancel, self.result_cache,
+                                                         self.calculation),
+                                                   daemon=True)
+        self.calculation_thread.start()
+        self.after(WindForceGUI.PROGRESS_POLL_MS, self.poll_calculation)
+
+    @staticmethod
+    def run_calculation(input_parameters_calculation, calculation_queue, cancel_event, result_cache=None,
+                        calculation=None):
+        """
+        Runs in the worker thread, must not access tkinter. Progress and results are passed through the queue.
+        :param input_parameters_calculation: list of the six input dicts
+        :param calculation_queue: queue.Queue for ('progress', stage), ('done', (solution, calculation)),
+                                  ('error', message) and ('cancelled', None)
+        :param cancel_event: threading.Event, set to cancel the calculation
+        :param result_cache: optional cache.ResultCache
+        :param calculation: optional Calculation of the previous run, updated incrementally (see Calculation.update)
         :return:
         """
-        if len(node_list) < 100:
-            x_data, y_data, z_data = zip(*node_list)
-            x_data = np.array(x_data)
-            y_data = np.array(y_data)
-            z_data = np.array(z_data)
-            z_interpolation = np.linspace(min(z_data), max(z_data), num=100)
-            x_interpolation = np.interp(z_interpolation, z_data, x_data)
-            new_list = list(zip(x_interpolation, z_interpolation))
 
-            return [[x, y] for x, y in new_list]
+        def progress(stage):
+            if cancel_event.is_set():
+                raise CalculationCancelled()
+            calculation_queue.put(('progress', stage))
+
+        try:
+            if calculation is None:
+                calculation = Calculation(*input_parameters_calculation, progress=progress, cache=result_cache)
+                solution = calculation.return_solution()
+            else:
+                calculation.progress = progress
+                solution = calculation.update(*input_parameters_calculation)
+        except CalculationCancelled:
+            calculation_queue.put(('cancelled', None))
+        except Exception as error:
+            calculation_queue.put(('error', f"{type(error).__name__}: {error}"))
         else:
-            return node_list
+            # A cancel during the last stage cannot interrupt the solver, the result is discarded
+            calculation_queue.put(('cancelled', None) if cancel_event.is_set() else ('done', (solution, calculation)))
 
-    def start_calculation(self):
+    def open_progress_window(self):
         """
-        ...
+        Creates the progress window with a progress bar and a Cancel button
         :return:
         """
+        self.progress_window = tk.Toplevel(self)
+        self.progress_window.title("Calculation")
+        self.progress_window.geometry(f"{300}x{120}")
+        self.progress_window.resizable(False, False)
+        self.progress_window.protocol("WM_DELETE_WINDOW", self.cancel_calculation)
+        self.progress_stage = tk.StringVar()
+        self.progress_stage.set('Starting calculation...')
+        progress_label = tk.Label(self.progress_window, textvariable=self.progress_stage,
+                                  font=WindForceGUI.STANDARD_FONT_1)
+        progress_label.place(relx=0.05, rely=0.05)
+        self.progress_bar = ttk.Progressbar(self.progress_window, orient='horizontal', length=270, mode='determinate',
+                                            maximum=len(Calculation.STAGES))
+        self.progress_bar.place(relx=0.05, rely=0.35)
+        self.progress_cancel_button = tk.Button(self.progress_window, text="Cancel", command=self.cancel_calculation,
+                                                font=WindForceGUI.STANDARD_FONT_BUTTON, width=10, height=1)
+        self.progress_cancel_button.place(relx=0.05, rely=0.65)
+
+    def cancel_calculation(self):
+        """
+        Requests the worker to stop, it stops at the start of the next stage
+        :return:
+        """
+        self.calculation_cancel.set()
+        self.progress_stage.set('Cancelling...')
+        self.progress_cancel_button.config(state='disabled')
+
+    def poll_calculation(self):
+        """
+        Handles the messages of the worker thread in the Tk event loop
+        :return:
+        """
+        while True:
+            try:
+                message, value = self.calculation_queue.get_nowait()
+            except queue.Empty:
+                break
+            if message == 'progress':
+                if not self.calculation_cancel.is_set():
+                    self.progress_stage.set(f"{value.capitalize()}...")
+                self.progress_bar['value'] = Calculation.STAGES.index(value)
+                continue
+            self.progress_window.destroy()
+            # A cancelled or failed run may leave the model half updated, the next run starts from scratch
+            self.calculation = None
+            if message == 'done':
+                self.solution, self.calculation = value
+                # updates system information
+                self.update_current_system_info()
+                self.show_solution()
+            elif message == 'error':
+                messagebox.showerror("Calculation failed", value, parent=self)
+            return
+        self.after(WindForceGUI.PROGRESS_POLL_MS, self.poll_calculation)
+
+    def show_solution(self):
+        """
+        Creates the FEM Solution window for self.solution
+        :return:
+        """
+        # Inputs and solver information of this solution for "Save Output", later runs update self.calculation
+        output_solution = self.solution
+        solution_inputs = self.calculation.snapshot_inputs()
+        solution_solver_info = self.calculation.solver_info
+
+        # Canvas items of the mode shape (center line first, then the segments) and the canvas coordinates and colors
+        # of the modes, both are reused when switching between modes
+        solution_line_items = []
+        solution_drawings = {}
 
         def update_solution(*args):
             eigen_freq_selected = solution_eigen_freq_selected.get()
-            eigen_freq_selected = eigen_freq_selected.split('Eigenfreq.: ')[-1]
-            solution = self.solution
-            eigen_freq_selected = solution.get(int(eigen_freq_selected), None)
+            mode = int(eigen_freq_selected.split('Eigenfreq.: ')[-1])
+            eigen_freq_selected = output_solution.get(mode, None)
 
             if not eigen_freq_selected:
                 print("Debug: Fehler bei Eigenfrequenzwahl")
 
             eigen_freq_selected_freq = eigen_freq_selected['eigenfreq']
-            solution_nodes = eigen_freq_selected['solution']
-            solution_nodes = self.interpolate_list(solution_nodes)
-            solution_nodes_trans = self.transform_solution(solution_nodes)
+            if mode not in solution_drawings:
+                solution_nodes = self.interpolate_list(eigen_freq_selected['solution'])
+                solution_nodes_trans = self.decimate_solution(self.transform_solution(solution_nodes))
+                solution_drawings[mode] = (solution_nodes_trans, self.solution_colors(solution_nodes_trans))
 
             # update text
             self.selected_eigen_freq.set(eigen_freq_selected_freq)
-            # update graphiocs
-            all_canvas_elements = self.canvas_solution.find_all()
-            for elem in all_canvas_elements:
-                self.canvas_solution.delete(elem)
-            self.add_canvas_solution_static_elements()
-            self.draw_solution(solution_nodes_trans)
+            # update graphics
+            self.draw_solution(canvas_solution, solution_line_items, *solution_drawings[mode])
 
         def button_save_output():
             file_path = filedialog.asksaveasfilename(
-                defaultextension=".txt",
-                filetypes=[("Text Files", "*.txt"), ("All Files", "*.*")],
+                defaultextension=".wfr",
+                filetypes=[("WindForce Results", "*.wfr"), ("All Files", "*.*")],
                 title="Save Output As",
             )
             if file_path:
-                with open(file_path, "w") as file:
-                    file.write(str(self.solution))
-
-        # get calculation
-        input_parameters_calculation = [self.input_parameters['sections'],
-                                        self.input_parameters['springs'],
-                                        self.input_parameters['masses'],
-                                        self.input_parameters['forces'],
-                                        self.input_parameters['excentricity'],
-                                        self.input_parameters['calculation_param']
-                                        ]
-        calculation = Calculation(*input_parameters_calculation)
-        self.solution = calculation.return_solution()
-
-        # updates system information
-        self.update_current_system_info()
+                write_result(file_path, output_solution, inputs=solution_inputs, solver_info=solution_solver_info)
 
         # creates FEM Solution window
         fem_solution_window = tk.Toplevel(self)
@@ -729,10 +875,11 @@ class WindForceGUI(tk.Tk):
         # graphical output
         self.canvas_sol_w = 400
         self.canvas_sol_h = 550
-        self.canvas_solution = tk.Canvas(fem_solution_window, width=self.canvas_sol_w, height=self.canvas_sol_h,
-                                         bg="gray")
-        self.canvas_solution.place(relx=200 / 600 - 0.025, rely=(1 - (550 / 600)) / 2)
+        canvas_solution = self.canvas_solution = tk.Canvas(fem_solution_window, width=self.canvas_sol_w,
+                                                           height=self.canvas_sol_h, bg="gray")
+        canvas_solution.place(relx=200 / 600 - 0.025, rely=(1 - (550 / 600)) / 2)
         self.add_canvas_solution_static_elements()
+        solution_line_items.append(canvas_solution.create_line(0, 0, 0, 0, fill='dark green', width=2))
 
         # Selector for eigenfrequency
         solution_eigen_freq_label = tk.Label(fem_solution_window, text="Select Eigenfrequency",
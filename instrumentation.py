@@ -0,0 +1,102 @@
+"""
+#######################################################################
+LICENSE INFORMATION
+This file is part of Windforce.
+
+Windforce is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Windforce is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Windforce. If not, see <https://www.gnu.org/licenses/>.
+#######################################################################
+
+#######################################################################
+Description:
+Per-stage instrumentation of calculations: wall time, peak memory and stage specific values
+#######################################################################
+"""
+
+import time
+import tracemalloc
+
+
+class Instrumentation:
+    """
+    Records the stages of one run, a stage lasts until the next stage starts or the run stops
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        """
+        :param trace_memory: record the peak memory allocated during each stage with tracemalloc. Only allocations
+                             of Python and NumPy are traced, not those of SuperLU or ARPACK.
+        """
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self.current_stage = None
+        self.stage_start = 0.
+        self.run_start = 0.
+        self.started_tracing = False
+
+    def start(self):
+        """
+        Starts a run, the stages of the previous run are discarded
+        :return:
+        """
+        self.stages = {}
+        self.current_stage = None
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+        self.run_start = time.perf_counter()
+
+    def start_stage(self, stage: str):
+        """
+        :param stage: name of the stage
+        :return:
+        """
+        self.finish_stage()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        self.current_stage = stage
+        self.stages[stage] = {'time': None, 'peak_memory': None}
+        self.stage_start = time.perf_counter()
+
+    def record(self, **values):
+        """
+        Adds values to the current stage, e.g. the number of DOFs of the assembly
+        :param values: JSON serializable values
+        :return:
+        """
+        if self.current_stage is not None:
+            self.stages[self.current_stage].update(values)
+
+    def finish_stage(self):
+        if self.current_stage is None:
+            return
+        stage = self.stages[self.current_stage]
+        stage['time'] = time.perf_counter() - self.stage_start
+        if self.trace_memory:
+            stage['peak_memory'] = tracemalloc.get_traced_memory()[1]
+        self.current_stage = None
+
+    def stop(self):
+        """
+        Finishes the run, tracemalloc is stopped if it was started by this run
+        :return: Dict with total time [s], peak memory [bytes] (None if not traced) and stages
+                 {stage: {'time', 'peak_memory', recorded values}}
+        """
+        self.finish_stage()
+        total_time = time.perf_counter() - self.run_start
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+        peak_memory = max((stage['peak_memory'] for stage in self.stages.values()), default=None) \
+            if self.trace_memory else None
+        return {'time': total_time, 'peak_memory': peak_memory, 'stages': self.stages}
@@ -20,13 +20,19 @@ along with Windforce. If not, see <https://www.gnu.org/licenses/>.
 #######################################################################
 Description:
 Main file
-Execute to start
+Execute to start the GUI, with arguments the headless batch calculation is started (see cli.py)
 #######################################################################
 """
 
-from gui import WindForceGUI
+import sys
 
 
 if __name__ == '__main__':
-    gui = WindForceGUI()
-    gui.mainloop()
\ No newline at end of file
+    if len(sys.argv) > 1:
+        from cli import main
+        sys.exit(main())
+    else:
+        # GUI is only imported here, batch runs must not need tkinter, PIL or a display
+        from gui import WindForceGUI
+        gui = WindForceGUI()
+        gui.mainloop()
\ No newline at end of file
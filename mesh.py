@@ -0,0 +1,158 @@
+"""
+#######################################################################
+LICENSE INFORMATION
+This file is part of Windforce.
+
+Windforce is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Windforce is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Windforce. If not, see <https://www.gnu.org/licenses/>.
+#######################################################################
+
+#######################################################################
+Description:
+Beam mesh of the tower and the excentricity. The sections are stacked from the base (node 0) upwards along z, the
+excentricity elements continue the chain from the tower top along x. All data is stored in preallocated arrays.
+#######################################################################
+"""
+
+import numpy as np
+
+# Section index of the excentricity elements in Mesh.element_sections
+EXCENTRICITY_SECTION = -1
+
+
+def calc_dof_map(num_dofs, constrained_dofs):
+    """
+    Numbers the free DOFs consecutively, constrained DOFs are not part of the system matrices
+    :param num_dofs: number of global DOFs
+    :param constrained_dofs: global indices of the constrained DOFs
+    :return: dof_map of shape (num_dofs,) with the index in the system matrices of each global DOF (-1 if
+             constrained), global indices of the free DOFs
+    """
+    free = np.ones(num_dofs, dtype=bool)
+    free[np.asarray(constrained_dofs, dtype=np.int64)] = False
+    dof_map = np.full(num_dofs, -1, dtype=np.int64)
+    free_dofs = np.flatnonzero(free)
+    dof_map[free_dofs] = np.arange(free_dofs.size)
+    return dof_map, free_dofs
+
+
+class Mesh:
+    """
+    Nodes, element connectivity and DOF numbering of the chain of beam elements
+    """
+
+    __slots__ = ('section_ids', 'section_offsets', 'nodes', 'connectivity', 'element_sections', 'element_lengths',
+                 'element_dofs', 'dof_map', 'free_dofs')
+
+    def __init__(self, section_ids, section_offsets, nodes, connectivity, element_sections, element_lengths):
+        """
+        :param section_ids: ids of the sections in mesh order, stored as str
+        :param section_offsets: index of the first element of each section and the number of tower elements, shape
+                                (n_sections + 1,)
+        :param nodes: node coordinates of shape (n_nodes, 3) [m]
+        :param connectivity: nodes of each element, shape (n_elements, 2)
+        :param element_sections: index of the section of each element (EXCENTRICITY_SECTION for the excentricity)
+        :param element_lengths: element lengths [m]
+        """
+        self.section_ids = [str(section_id) for section_id in section_ids]
+        self.section_offsets = section_offsets
+        self.nodes = nodes
+        self.connectivity = connectivity
+        self.element_sections = element_sections
+        self.element_lengths = element_lengths
+        # Global DOFs of each element: the 6 DOFs of its first node followed by those of its second node
+        self.element_dofs = (6 * connectivity[:, :, np.newaxis] + np.arange(6)).reshape(-1, 12)
+        self.dof_map = np.full(6 * len(nodes), -1, dtype=np.int64)
+        self.free_dofs = np.array([], dtype=np.int64)
+
+    @classmethod
+    def from_sections(cls, section_heights, fem_density: int, exc_ex: float = 0.):
+        """
+        Meshes the tower in one vectorized pass. Each section is divided into fem_density elements per height of
+        the shortest section (rounded), the excentricity into elements of the same length (rounded, at least one).
+        :param section_heights: Dict section id -> section height [m], in order from the base
+        :param fem_density: elements of the shortest section
+        :param exc_ex: length of the excentricity [m], no excentricity elements if 0
+        :return: Mesh
+        """
+        heights = np.fromiter(section_heights.values(), dtype=np.float64, count=len(section_heights))
+        min_height = heights.min()
+        num_elements = fem_density * np.round(heights / min_height).astype(np.int64)
+        section_offsets = np.concatenate(([0], np.cumsum(num_elements)))
+        section_bases = np.concatenate(([0.], np.cumsum(heights)))
+        num_tower_elements = int(section_offsets[-1])
+        element_sections = np.repeat(np.arange(heights.size), num_elements)
+        element_lengths = (heights / num_elements)[element_sections]
+        # Top of each element relative to the base of its section, from the index of the element in its section
+        element_index = np.arange(num_tower_elements) - section_offsets[element_sections]
+        num_exc_elements = max(int(round(fem_density * exc_ex / min_height)), 1) if exc_ex > 0 else 0
+
+        nodes = np.zeros((num_tower_elements + num_exc_elements + 1, 3))
+        nodes[1:num_tower_elements + 1, 2] = section_bases[element_sections] + (element_index + 1) * element_lengths
+        if num_exc_elements:
+            nodes[num_tower_elements + 1:, 0] = np.arange(1, num_exc_elements + 1) * (exc_ex / num_exc_elements)
+            nodes[num_tower_elements + 1:, 2] = nodes[num_tower_elements, 2]
+            element_sections = np.concatenate((element_sections,
+                                               np.full(num_exc_elements, EXCENTRICITY_SECTION)))
+            element_lengths = np.concatenate((element_lengths, np.full(num_exc_elements, exc_ex / num_exc_elements)))
+        # Chain: element i connects node i and node i + 1
+        connectivity = np.arange(len(nodes) - 1)[:, np.newaxis] + np.array([0, 1])
+        return cls(section_heights.keys(), section_offsets, nodes, connectivity, element_sections, element_lengths)
+
+    @classmethod
+    def empty(cls):
+        """
+        :return: Mesh without nodes, e.g. of a calculation that was not started yet
+        """
+        return cls([], np.zeros(1, dtype=np.int64), np.zeros((0, 3)), np.zeros((0, 2), dtype=np.int64),
+                   np.zeros(0, dtype=np.int64), np.zeros(0))
+
+    @property
+    def num_nodes(self):
+        return len(self.nodes)
+
+    @property
+    def num_elements(self):
+        return len(self.connectivity)
+
+    @property
+    def head_node(self):
+        """
+        Node of the tower head (the tower top, where the excentricity arm starts): the head springs, the head mass
+        and the head loads act on it, see supp/system.png
+        :return: index of the node at the tower top
+        """
+        return int(self.section_offsets[-1])
+
+    def section_elements(self, section_id) -> slice:
+        """
+        :param section_id: id of the section
+        :return: slice of the elements of the section
+        """
+        index = self.section_ids.index(str(section_id))
+        return slice(int(self.section_offsets[index]), int(self.section_offsets[index + 1]))
+
+    @property
+    def excentricity_elements(self) -> slice:
+        """
+        :return: slice of the excentricity elements, empty without excentricity
+        """
+        return slice(self.head_node, self.num_elements)
+
+    def number_dofs(self, constrained_dofs):
+        """
+        Numbers the free DOFs, see calc_dof_map
+        :param constrained_dofs: global indices of the constrained DOFs
+        :return:
+        """
+        self.dof_map, self.free_dofs = calc_dof_map(6 * self.num_nodes, constrained_dofs)
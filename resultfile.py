@@ -0,0 +1,190 @@
+"""
+#######################################################################
+LICENSE INFORMATION
+This file is part of Windforce.
+
+Windforce is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Windforce is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Windforce. If not, see <https://www.gnu.org/licenses/>.
+#######################################################################
+
+#######################################################################
+Description:
+Binary result file format (.wfr). A file is a sequence of records, one per solution:
+    magic b'WFRESULT' | format version (uint32 LE) | header length (uint32 LE) | JSON header | raw arrays
+The JSON header holds the eigenfrequencies, the inputs, the solver information and free metadata, and describes
+the raw arrays (dtype, shape and offset from the start of the array data). The arrays start 64-byte aligned:
+    nodes           (n_nodes, 3)
+    displacements   (n_modes, n_nodes, 6), mode-major so that one mode is one contiguous block
+Records are appended one after another, so that sweeps can stream their solutions to disk.
+#######################################################################
+"""
+
+import json
+import struct
+from typing import Dict
+import numpy as np
+from solution import ModalSolution
+
+MAGIC = b'WFRESULT'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+_PREFIX = struct.Struct('<8sII')
+
+
+def solver_metadata(solver_info: Dict):
+    """
+    Converts the solver information of a calculation (see eigensolvers.solve_eigen) to JSON serializable values
+    :param solver_info: Dict with solver, time, iterations, residual_norms and warm_start, may be empty
+    :return: Dict or None if solver_info is empty (e.g. cached solution)
+    """
+    if not solver_info:
+        return None
+    return {key: value.tolist() if isinstance(value, np.ndarray) else value for key, value in solver_info.items()}
+
+
+class ResultWriter:
+    """
+    Appends solutions as records to a result file, use as context manager
+    """
+
+    def __init__(self, path: str, append: bool = False):
+        """
+        :param path: file path, usually with extension .wfr
+        :param append: append to an existing file instead of overwriting it
+        """
+        self.file = open(path, "ab" if append else "wb")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.file.close()
+
+    def write(self, solution: ModalSolution, inputs: Dict = None, solver_info: Dict = None, metadata: Dict = None):
+        """
+        Writes one record, the displacements are written mode by mode without a transposed copy of the whole array
+        :param solution: solution.ModalSolution
+        :param inputs: optional Dict with the six input dicts
+        :param solver_info: optional solver information, see eigensolvers.solve_eigen
+        :param metadata: optional JSON serializable Dict, e.g. the parameters of a sweep configuration
+        :return:
+        """
+        nodes = np.ascontiguousarray(solution.nodes, dtype='<f8')
+        displacements = solution.displacements
+        dtype = displacements.dtype.newbyteorder('<')
+        num_nodes, num_modes = nodes.shape[0], len(solution)
+        displacements_offset = _aligned(nodes.nbytes)
+        header = {'eigenfreqs': np.asarray(solution.eigenfreqs, dtype=np.float64).tolist(),
+                  'inputs': inputs,
+                  'solver': solver_metadata(solver_info),
+                  'metadata': metadata,
+                  'arrays': {'nodes': {'dtype': nodes.dtype.str, 'shape': list(nodes.shape), 'offset': 0},
+                             'displacements': {'dtype': dtype.str, 'shape': [num_modes, num_nodes, 6],
+                                               'offset': displacements_offset}},
+                  'data_size': displacements_offset + num_modes * num_nodes * 6 * dtype.itemsize}
+        header_bytes = json.dumps(header).encode()
+        # Pad the header with spaces so that the array data starts aligned
+        header_bytes += b' ' * (_aligned(_PREFIX.size + len(header_bytes)) - _PREFIX.size - len(header_bytes))
+        self.file.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+        self.file.write(header_bytes)
+        self.file.write(nodes.tobytes())
+        self.file.write(b'\0' * (displacements_offset - nodes.nbytes))
+        for mode in range(num_modes):
+            self.file.write(np.ascontiguousarray(displacements[:, :, mode], dtype=dtype).tobytes())
+
+
+def _aligned(size: int) -> int:
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+
+class ResultFile:
+    """
+    Reads the records of a result file. The arrays are memory-mapped by default, so that reading one mode only
+    reads that mode from disk.
+    """
+
+    def __init__(self, path: str, mmap: bool = True):
+        """
+        :param path: file path
+        :param mmap: memory-map the arrays, otherwise they are read into memory
+        """
+        self.path = path
+        self.mmap = mmap
+        self.headers = []
+        self.data_offsets = []
+        with open(path, "rb") as file:
+            while True:
+                prefix = file.read(_PREFIX.size)
+                if not prefix:
+                    break
+                if len(prefix) < _PREFIX.size:
+                    raise ValueError(f"'{path}' is truncated")
+                magic, version, header_length = _PREFIX.unpack(prefix)
+                if magic != MAGIC:
+                    raise ValueError(f"'{path}' is not a WindForce result file")
+                if version > FORMAT_VERSION:
+                    raise ValueError(f"'{path}' has format version {version}, supported up to {FORMAT_VERSION}")
+                header = json.loads(file.read(header_length))
+                self.headers.append(header)
+                self.data_offsets.append(file.tell())
+                file.seek(header['data_size'], 1)
+
+    def __len__(self):
+        return len(self.headers)
+
+    def __getitem__(self, index: int) -> ModalSolution:
+        """
+        :param index: index of the record
+        :return: solution.ModalSolution, its displacements are a view of shape (n_nodes, 6, n_modes)
+        """
+        header = self.headers[index]
+        arrays = {name: self.read_array(self.data_offsets[index] + array['offset'], np.dtype(array['dtype']),
+                                        tuple(array['shape'])) for name, array in header['arrays'].items()}
+        return ModalSolution(arrays['nodes'], np.array(header['eigenfreqs']),
+                             arrays['displacements'].transpose(1, 2, 0))
+
+    def __iter__(self):
+        return (self[index] for index in range(len(self)))
+
+    def read_array(self, offset: int, dtype, shape):
+        if self.mmap:
+            if 0 in shape:
+                return np.zeros(shape, dtype=dtype)
+            return np.memmap(self.path, dtype=dtype, mode='r', offset=offset, shape=shape)
+        with open(self.path, "rb") as file:
+            file.seek(offset)
+            return np.fromfile(file, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+
+
+def write_result(path: str, solution: ModalSolution, inputs: Dict = None, solver_info: Dict = None,
+                 metadata: Dict = None):
+    """
+    Writes a result file with one record, see ResultWriter.write
+    """
+    with ResultWriter(path) as writer:
+        writer.write(solution, inputs, solver_info, metadata)
+
+
+def read_result(path: str, index: int = 0, mmap: bool = True):
+    """
+    Reads one record of a result file
+    :param path: file path
+    :param index: index of the record
+    :param mmap: memory-map the arrays
+    :return: solution.ModalSolution, header Dict with eigenfreqs, inputs, solver and metadata
+    """
+    result_file = ResultFile(path, mmap)
+    return result_file[index], result_file.headers[index]
@@ -0,0 +1,82 @@
+"""
+#######################################################################
+LICENSE INFORMATION
+This file is part of Windforce.
+
+Windforce is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Windforce is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Windforce. If not, see <https://www.gnu.org/licenses/>.
+#######################################################################
+
+#######################################################################
+Description:
+Compact storage of the eigenfrequencies and mode shapes of a calculation
+#######################################################################
+"""
+
+import operator
+from collections.abc import Mapping
+import numpy as np
+
+
+class ModalSolution(Mapping):
+    """
+    Eigenfrequencies and mode shapes, the displacements of all modes are stored in one contiguous array and the
+    deformed node coordinates of a mode are only computed on access. As Mapping mode -> {'eigenfreq', 'solution'}
+    it can be used like the Dict of ABCCalculation.return_solution.
+    The displacements hold 6 values per node and mode, twice the 3 deformed coordinates per node and mode of that
+    Dict, so in float64 the solution needs about twice its memory. Stored as float32 (see Calculation) it needs
+    about the same memory, the saving of this layout is the contiguous storage and not its size.
+    """
+
+    def __init__(self, nodes, eigenfreqs, displacements):
+        """
+        :param nodes: node coordinates of shape (n_nodes, 3) [m]
+        :param eigenfreqs: eigenfrequencies of shape (n_modes,)
+        :param displacements: displacements (ux, uy, uz, phix, phiy, phiz) of every node and mode, shape
+                              (n_nodes, 6, n_modes), each mode is scaled to a max. absolute displacement of 1
+        """
+        self.nodes = nodes
+        self.eigenfreqs = eigenfreqs
+        self.displacements = displacements
+
+    def __getitem__(self, mode):
+        try:
+            mode = operator.index(mode)
+        except TypeError:
+            raise KeyError(mode) from None
+        if not 0 <= mode < len(self):
+            raise KeyError(mode)
+        return {'eigenfreq': self.eigenfreqs[mode], 'solution': self.deformed(mode)}
+
+    def __iter__(self):
+        return iter(range(len(self)))
+
+    def __len__(self):
+        return self.eigenfreqs.size
+
+    def __repr__(self):
+        return f"ModalSolution(n_nodes={len(self.nodes)}, eigenfreqs={np.array2string(self.eigenfreqs, precision=4)})"
+
+    def deformed(self, mode: int, scale: float = 1.):
+        """
+        :param mode: index of the mode
+        :param scale: scale factor of the displacements
+        :return: deformed node coordinates of shape (n_nodes, 3)
+        """
+        return self.nodes + scale * self.displacements[:, :3, mode]
+
+    def to_dict(self):
+        """
+        :return: Dict {mode: {'eigenfreq', 'solution'}} with the deformed node coordinates of every mode
+        """
+        return {mode: self[mode] for mode in self}
@@ -0,0 +1,230 @@
+"""
+#######################################################################
+LICENSE INFORMATION
+This file is part of Windforce.
+
+Windforce is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Windforce is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Windforce. If not, see <https://www.gnu.org/licenses/>.
+#######################################################################
+
+#######################################################################
+Description:
+Parameter sweeps over tower configurations, solved in a process pool
+#######################################################################
+"""
+
+import copy
+import itertools
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict
+import numpy as np
+from cache import ResultCache
+from calculation import Calculation
+from resultfile import ResultWriter
+from solution import ModalSolution
+
+INPUT_KEYS = ('sections', 'springs', 'masses', 'forces', 'excentricity', 'calculation_param')
+
+# Input, result cache and whether to return the full solutions of the worker processes, set once per worker by
+# _init_worker
+_worker_base_input = None
+_worker_cache = None
+_worker_full_solutions = False
+# Calculation of each worker process, reused for all its configurations (see Calculation.update)
+_worker_calculation = None
+
+
+class SweepResult:
+    """
+    Columnar results of a parameter sweep
+    """
+
+    def __init__(self, parameters: Dict, eigenfreqs, errors):
+        """
+        :param parameters: Dict parameter path -> array of the values of every configuration
+        :param eigenfreqs: eigenfrequencies of shape (configurations, modes), NaN where not available
+        :param errors: Dict configuration index -> error message of failed configurations
+        """
+        self.parameters = parameters
+        self.eigenfreqs = eigenfreqs
+        self.errors = errors
+
+    def __len__(self):
+        return self.eigenfreqs.shape[0]
+
+    @property
+    def failed(self):
+        """
+        :return: boolean mask of the failed configurations
+        """
+        mask = np.zeros(len(self), dtype=bool)
+        mask[list(self.errors)] = True
+        return mask
+
+
+def set_parameter(input_parameters: Dict, path: str, value):
+    """
+    Sets a value in the input dicts, the path is given as '<input>.<key>' or '<input>.<section>.<key>', e.g.
+    'masses.head_m' or 'sections.0.sec_thickness'. The section '*' sets the key in all sections.
+    :param input_parameters: Dict with the six input dicts (schema of supp/Input_exemp.json)
+    :param path: parameter path
+    :param value: value to set
+    :return:
+    """
+    keys = path.split('.')
+    if keys[0] not in INPUT_KEYS:
+        raise KeyError(f"unknown input '{keys[0]}' in parameter path '{path}'")
+    if keys[0] == 'sections':
+        if len(keys) != 3:
+            raise KeyError(f"section parameter path '{path}' must be 'sections.<section>.<key>'")
+        sections = input_parameters['sections']
+        section_ids = list(sections) if keys[1] == '*' else [keys[1]]
+        for section_id in section_ids:
+            if section_id not in sections:
+                raise KeyError(f"unknown section '{section_id}' in parameter path '{path}'")
+            sections[section_id][keys[2]] = value
+    else:
+        if len(keys) != 2:
+            raise KeyError(f"parameter path '{path}' must be '<input>.<key>'")
+        input_parameters[keys[0]][keys[1]] = value
+
+
+def configurations(grid: Dict = None, samples: Dict = None):
+    """
+    Builds the columns of the parameter values of all configurations. The full factorial of the grid values is
+    combined with every sample (samples are given as equally long lists, one configuration per index).
+    :param grid: Dict parameter path -> list of values
+    :param samples: Dict parameter path -> list of values
+    :return: Dict parameter path -> array of the values of every configuration
+    """
+    grid = grid or {}
+    samples = samples or {}
+    sample_lengths = {len(values) for values in samples.values()}
+    if len(sample_lengths) > 1:
+        raise ValueError("all sample lists must have the same length")
+    num_samples = sample_lengths.pop() if sample_lengths else 1
+    grid_columns = [np.asarray(values) for values in grid.values()]
+    num_grid = math.prod(len(values) for values in grid_columns)
+    columns = {}
+    # Grid values vary slowest, samples fastest
+    for path, values in zip(grid, np.meshgrid(*grid_columns, indexing='ij') if grid else []):
+        columns[path] = np.repeat(values.ravel(), num_samples)
+    for path, values in samples.items():
+        columns[path] = np.tile(np.asarray(values), num_grid)
+    return columns
+
+
+def _init_worker(base_input, cache_dir, full_solutions=False):
+    global _worker_base_input, _worker_cache, _worker_full_solutions, _worker_calculation
+    _worker_base_input = base_input
+    _worker_cache = ResultCache(cache_dir) if cache_dir else None
+    _worker_full_solutions = full_solutions
+    _worker_calculation = None
+
+
+def _configuration_input(base_input: Dict, overrides: Dict) -> Dict:
+    input_parameters = copy.deepcopy(base_input)
+    for path, value in overrides.items():
+        set_parameter(input_parameters, path, value)
+    return input_parameters
+
+
+def _solve_chunk(chunk):
+    """
+    Solves a chunk of configurations in a worker process. The Calculation of the worker is updated from one
+    configuration to the next, so that configurations with the same mesh only patch the model.
+    :param chunk: list of Dicts parameter path -> value
+    :return: list of eigenfrequency arrays (solution.ModalSolution if full solutions are requested) or error messages
+    """
+    global _worker_calculation
+    results = []
+    for overrides in chunk:
+        try:
+            input_parameters = _configuration_input(_worker_base_input, overrides)
+            if _worker_calculation is None:
+                _worker_calculation = Calculation(*[input_parameters[key] for key in INPUT_KEYS], cache=_worker_cache)
+                solution = _worker_calculation.return_solution()
+            else:
+                solution = _worker_calculation.update(*[input_parameters[key] for key in INPUT_KEYS])
+            results.append(solution if _worker_full_solutions else solution.eigenfreqs)
+        except Exception as error:
+            results.append(f"{type(error).__name__}: {error}")
+    return results
+
+
+def run_sweep(base_input: Dict, grid: Dict = None, samples: Dict = None, processes: int = None,
+              chunksize: int = None, cache_dir: str = None, results_path: str = None) -> SweepResult:
+    """
+    Solves every configuration of the sweep in a process pool, without GUI
+    :param base_input: Dict with the six input dicts (schema of supp/Input_exemp.json)
+    :param grid: Dict parameter path -> list of values, see set_parameter and configurations
+    :param samples: Dict parameter path -> list of values, see set_parameter and configurations
+    :param processes: number of worker processes, defaults to the number of CPUs. 1 solves in this process.
+    :param chunksize: configurations per task, defaults to about four tasks per worker
+    :param cache_dir: optional directory of a cache.ResultCache shared by the workers
+    :param results_path: optional result file (see resultfile), the solutions of the successful configurations are
+                         streamed to it in configuration order with metadata {'configuration', 'parameters'}
+    :return: SweepResult
+    """
+    columns = configurations(grid, samples)
+    num_configs = len(next(iter(columns.values()))) if columns else 1
+    overrides = [{path: values[index].item() for path, values in columns.items()} for index in range(num_configs)]
+    processes = processes or os.cpu_count() or 1
+    processes = min(processes, num_configs)
+    chunksize = chunksize or max(1, math.ceil(num_configs / (4 * processes)))
+    chunks = [overrides[index:index + chunksize] for index in range(0, num_configs, chunksize)]
+
+    full_solutions = results_path is not None
+    if processes == 1:
+        _init_worker(base_input, cache_dir, full_solutions)
+        results = _collect_results(map(_solve_chunk, chunks), base_input, overrides, results_path)
+    else:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                 initargs=(base_input, cache_dir, full_solutions)) as executor:
+            results = _collect_results(executor.map(_solve_chunk, chunks), base_input, overrides, results_path)
+
+    num_modes = max((result.size for result in results if not isinstance(result, str)), default=0)
+    eigenfreqs = np.full((num_configs, num_modes), np.nan)
+    errors = {}
+    for index, result in enumerate(results):
+        if isinstance(result, str):
+            errors[index] = result
+        else:
+            eigenfreqs[index, :result.size] = result
+    return SweepResult(columns, eigenfreqs, errors)
+
+
+def _collect_results(chunk_results, base_input: Dict, overrides, results_path: str = None):
+    """
+    Collects the results of the chunks as they arrive and writes full solutions to the result file
+    :param chunk_results: iterable of the results of _solve_chunk in configuration order
+    :param base_input: Dict with the six input dicts
+    :param overrides: list of the parameter overrides of every configuration
+    :param results_path: optional result file
+    :return: list of eigenfrequency arrays or error messages
+    """
+    results = []
+    writer = ResultWriter(results_path) if results_path is not None else None
+    try:
+        for index, result in enumerate(itertools.chain.from_iterable(chunk_results)):
+            if isinstance(result, ModalSolution):
+                writer.write(result, inputs=_configuration_input(base_input, overrides[index]),
+                             metadata={'configuration': index, 'parameters': overrides[index]})
+                result = result.eigenfreqs
+            results.append(result)
+    finally:
+        if writer is not None:
+            writer.close()
+    return results
@@ -0,0 +1,62 @@
+import copy
+import os
+import numpy as np
+from cache import EVICTION_TARGET, ResultCache
+from calculation import SOLVER_VERSION, Calculation
+from solution import ModalSolution
+from sweep import INPUT_KEYS
+from test_calculation import example_input
+
+
+def cached_solution(seed=0):
+    rng = np.random.default_rng(seed)
+    return ModalSolution(rng.standard_normal((20, 3)), np.arange(1., 5.), rng.standard_normal((20, 6, 4)))
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    cache.put('0', cached_solution())
+    entry_size = os.path.getsize(cache.path('0'))
+    cache.clear()
+    cache.max_size = 5.5 * entry_size
+    for index in range(5):
+        cache.put(str(index), cached_solution(index))
+        os.utime(cache.path(str(index)), (index, index))
+    assert cache.size == 5 * entry_size and cache.stats['evictions'] == 0
+    # Reading an entry marks it as recently used
+    assert cache.get('0') is not None
+    cache.put('5', cached_solution(5))
+    remaining = sorted(name[:-len('.npz')] for name in os.listdir(str(tmp_path)) if name.endswith('.npz'))
+    assert len(remaining) == int(EVICTION_TARGET * cache.max_size // entry_size) == 4
+    assert remaining == ['0', '3', '4', '5']
+    assert cache.stats['evictions'] == 2 and cache.size == 4 * entry_size
+
+
+def test_hits_and_misses_are_counted(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    solution = cached_solution()
+    assert cache.get('entry') is None
+    cache.put('entry', solution)
+    cached = cache.get('entry')
+    np.testing.assert_array_equal(cached.displacements, solution.displacements)
+    assert cache.stats == {'hits': 1, 'misses': 1, 'evictions': 0}
+
+
+def test_key_is_independent_of_section_key_types():
+    input_parameters = example_input()
+    int_keyed = copy.deepcopy(input_parameters)
+    int_keyed['sections'] = {int(section_id): section for section_id, section in int_keyed['sections'].items()}
+    int_keyed['calculation_param']['fem_density'] = float(int_keyed['calculation_param']['fem_density'])
+    inputs = [input_parameters[key] for key in INPUT_KEYS]
+    cache_key = ResultCache.key(inputs, SOLVER_VERSION)
+    assert ResultCache.key([int_keyed[key] for key in INPUT_KEYS], SOLVER_VERSION) == cache_key
+    assert ResultCache.key(inputs, SOLVER_VERSION, np.float32) != cache_key
+
+
+def test_cache_hit_drops_solver_info(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    inputs = [example_input()[key] for key in INPUT_KEYS]
+    Calculation(*copy.deepcopy(inputs), cache=cache).return_solution()
+    calculation = Calculation(*copy.deepcopy(inputs), cache=cache, instrument=True)
+    calculation.return_solution()
+    assert cache.stats['hits'] == 1 and calculation.solver_info == {} and calculation.stats == {}
@@ -0,0 +1,174 @@
+import copy
+import json
+import math
+import os
+import warnings
+import numpy as np
+import pytest
+import eigensolvers
+from benchmark import tower_input
+from calculation import Calculation, Elements, calc_element_matrices
+from eigensolvers import RESIDUAL_TOLERANCE, eigen_residuals, solve_eigen
+from sweep import INPUT_KEYS
+
+EXAMPLE_INPUT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'supp',
+                             'Input_exemp.json')
+
+
+def example_input(**calculation_param):
+    """
+    :param calculation_param: values replacing those of the calculation_param input
+    :return: Dict with the six input dicts of supp/Input_exemp.json
+    """
+    with open(EXAMPLE_INPUT, "r") as file:
+        input_parameters = json.load(file)
+    input_parameters['calculation_param'].update(calculation_param)
+    return input_parameters
+
+
+def solve(input_parameters, calculation=None):
+    """
+    :param input_parameters: Dict with the six input dicts, copied
+    :param calculation: optional solved Calculation, updated to the inputs (see Calculation.update)
+    :return: solved Calculation
+    """
+    inputs = [copy.deepcopy(input_parameters[key]) for key in INPUT_KEYS]
+    if calculation is None:
+        calculation = Calculation(*inputs)
+        calculation.return_solution()
+    else:
+        calculation.update(*inputs)
+    return calculation
+
+
+@pytest.mark.parametrize('orientation', ['vertical', 'horizontal'])
+def test_element_matrices_match_reference(orientation):
+    rng = np.random.default_rng(1)
+    parameters = rng.uniform(0.5, 2., (5, 8)) * np.array([2., 0.3, 1e10, 1e9, 2e9, 5e8, 0.1, 3e3])
+    k_matrices, m_matrices = calc_element_matrices(*parameters.T, orientation)
+    for element_parameters, k_matrix, m_matrix in zip(parameters, k_matrices, m_matrices):
+        k_reference, m_reference = Elements(*element_parameters, orientation).calc_element_matrix()
+        np.testing.assert_allclose(k_matrix, k_reference, rtol=1e-12, atol=1e-12 * np.abs(k_reference).max())
+        np.testing.assert_allclose(m_matrix, m_reference, rtol=1e-12, atol=1e-12 * np.abs(m_reference).max())
+
+
+@pytest.mark.parametrize('solver', ['auto', 'lobpcg', 'shift_invert'])
+@pytest.mark.parametrize('edit', ['sec_E', 'fem_density'])
+def test_update_matches_fresh_solve(solver, edit):
+    input_parameters = example_input(fem_density=20, fem_solver=solver)
+    input_parameters['sections']['1']['sec_thickness'] = 20
+    input_parameters['excentricity'].update(exc_ex=3, exc_mass=2000)
+    calculation = solve(input_parameters)
+    if edit == 'sec_E':
+        # Patched in place, the warm start of LOBPCG does not converge and is repeated without start vectors
+        input_parameters['sections']['0']['sec_E'] = 100000
+    else:
+        input_parameters['calculation_param']['fem_density'] = 30
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        updated = solve(input_parameters, calculation)
+    input_parameters['calculation_param']['fem_solver'] = 'dense'
+    fresh = solve(input_parameters)
+    np.testing.assert_allclose(updated.solution.eigenfreqs, fresh.solution.eigenfreqs, rtol=1e-6)
+    assert updated.is_solved()
+
+
+@pytest.mark.parametrize('converged_modes', [0, 5])
+def test_stale_lobpcg_block_is_rejected(monkeypatch, converged_modes):
+    input_parameters = tower_input(100, 10, 10, solver='lobpcg')
+    previous = Calculation(*[copy.deepcopy(input_parameters[key]) for key in INPUT_KEYS])
+    previous.build_model()
+    input_parameters['sections']['0']['sec_E'] *= 0.5
+    calculation = Calculation(*[copy.deepcopy(input_parameters[key]) for key in INPUT_KEYS])
+    calculation.build_model()
+    k_glob, m_glob = calculation.k_glob, calculation.m_glob
+    assert k_glob.shape[0] >= 5000
+    shift_invert = eigensolvers.EIGEN_SOLVERS['shift_invert']
+    eigenvalues, eigenvectors, _ = shift_invert(k_glob, m_glob, 10)
+    stale_eigenvalues, stale_eigenvectors, _ = shift_invert(previous.k_glob, previous.m_glob, 10)
+    # The lowest modes of the edited model followed by stale modes of the previous one
+    block_eigenvalues = np.concatenate([eigenvalues[:converged_modes], stale_eigenvalues[converged_modes:]])
+    block_eigenvectors = np.hstack([eigenvectors[:, :converged_modes], stale_eigenvectors[:, converged_modes:]])
+    assert np.max(eigen_residuals(k_glob, m_glob, block_eigenvalues, block_eigenvectors)[0]) > RESIDUAL_TOLERANCE
+    solve_lobpcg = eigensolvers.EIGEN_SOLVERS['lobpcg']
+
+    def returns_block_if_warm_started(k_glob, m_glob, nbr_eigen_freq, initial_vectors=None):
+        if initial_vectors is None:
+            return solve_lobpcg(k_glob, m_glob, nbr_eigen_freq)
+        return block_eigenvalues, block_eigenvectors, 200
+
+    monkeypatch.setitem(eigensolvers.EIGEN_SOLVERS, 'lobpcg', returns_block_if_warm_started)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        solved_eigenvalues, _, solver_info = solve_eigen(k_glob, m_glob, 10, 'lobpcg', stale_eigenvectors)
+    assert solver_info['attempts'] > 1 and solver_info['converged']
+    np.testing.assert_allclose(solved_eigenvalues, eigenvalues, rtol=1e-4)
+
+
+def test_small_lobpcg_problem_reports_dense_solver():
+    input_parameters = example_input(fem_density=2, fem_solver='lobpcg', fem_decouple=False)
+    calculation = solve(input_parameters)
+    assert calculation.k_glob.shape[0] < 5 * calculation.calculation_param['fem_nbr_eigen_freq']
+    assert calculation.solver_info['solver'] == 'dense'
+
+
+@pytest.mark.parametrize('springs', [{}, {'base_cx': 1e9, 'base_phiy': 1e11, 'head_cx': 1e6}])
+def test_decoupled_solve_matches_coupled_solve(springs):
+    input_parameters = example_input(fem_density=30)
+    input_parameters['springs'].update(springs)
+    input_parameters['masses'].update(base_m=5e4, head_m=2e5)
+    decoupled = solve(input_parameters)
+    input_parameters['calculation_param']['fem_decouple'] = False
+    coupled = solve(input_parameters)
+    assert 'blocks' in decoupled.solver_info and 'blocks' not in coupled.solver_info
+    np.testing.assert_allclose(decoupled.solution.eigenfreqs, coupled.solution.eigenfreqs, rtol=1e-8)
+
+
+def test_static_cantilever_matches_beam_theory():
+    input_parameters = example_input()
+    section = input_parameters['sections']['0']
+    height = sum(section_values['sec_height'] for section_values in input_parameters['sections'].values())
+    ra = section['sec_ra_bot']
+    ri = ra - section['sec_thickness'] / 100
+    ei = section['sec_E'] * 1e6 * math.pi / 4 * (ra ** 4 - ri ** 4)
+    f_head, m_head = 1e5, 1e6
+    calculation = Calculation(*[input_parameters[key] for key in INPUT_KEYS])
+    result = calculation.solve_static([f_head, 0], [0, m_head])
+    # Both load cases of one factorization, the eigenvalue problem is not solved
+    assert calculation.is_built() and not calculation.is_solved()
+    head = result['displacements'][:, 0]
+    np.testing.assert_allclose(head[:, 0], [f_head * height ** 3 / (3 * ei), -m_head * height ** 2 / (2 * ei)],
+                               rtol=1e-10)
+    np.testing.assert_allclose(head[:, 4], [-f_head * height ** 2 / (2 * ei), m_head * height / ei], rtol=1e-10)
+    np.testing.assert_allclose(result['base_reactions'][:, [0, 4]], [[-f_head, f_head * height], [0, -m_head]],
+                               atol=1e-6 * f_head * height)
+
+
+def test_head_loads_act_on_head_mass_and_spring():
+    input_parameters = example_input()
+    input_parameters['excentricity'].update(exc_ex=3, exc_mass=2000)
+    input_parameters['springs']['head_cx'] = 1e6
+    input_parameters['masses']['head_m'] = 2e5
+    calculation = Calculation(*[input_parameters[key] for key in INPUT_KEYS])
+    calculation.build_model()
+    head_node = calculation.mesh.head_node
+    assert head_node < calculation.mesh.num_nodes - 1
+    head_ux = calculation.dof_map[6 * head_node]
+    point_elements = calculation.point_elements
+    assert calculation.dof_map[point_elements['DOFs'][point_elements['K'] > 0]].tolist() == [head_ux]
+    assert head_ux in calculation.dof_map[point_elements['DOFs'][point_elements['M'] > 0]]
+    load = calculation.calc_head_load(1e5, 1e6)
+    assert np.flatnonzero(load).tolist() == [head_ux, calculation.dof_map[6 * head_node + 4]]
+    assert calculation.solve_static(1e5, 0)['nodes'].tolist() == [head_node]
+
+
+def test_force_edits_keep_the_solved_model():
+    input_parameters = example_input()
+    calculation = solve(input_parameters)
+    calculation.solve_static()
+    solution, stiffness_factor = calculation.solution, calculation.stiffness_factor
+    input_parameters['forces'].update(f_rotor=0.3, f_head=2e5)
+    assert solve(input_parameters, calculation).solution is solution
+    assert calculation.is_solved() and calculation.stiffness_factor is stiffness_factor
+    input_parameters['masses']['head_m'] = 1e5
+    assert solve(input_parameters, calculation).solution is not solution
@@ -0,0 +1,18 @@
+import numpy as np
+from calculation import Calculation
+from frequencyresponse import excitation_frequencies, frequency_response
+from sweep import INPUT_KEYS
+from test_calculation import example_input
+
+
+def test_modal_response_matches_direct_response():
+    input_parameters = example_input()
+    input_parameters['forces'].update(f_excite=1.0, f_head=1e5)
+    calculation = Calculation(*[input_parameters[key] for key in INPUT_KEYS])
+    # 0.5 to 1.5 Hz around the first bending mode (1 Hz), the anti-resonances of ux and phiy are above 2.5 Hz
+    frequencies = excitation_frequencies(calculation.forces, num=50)
+    modal = frequency_response(calculation, frequencies, method='modal')
+    direct = frequency_response(calculation, frequencies, method='direct')
+    np.testing.assert_array_equal(modal['nodes'], [calculation.mesh.head_node])
+    np.testing.assert_allclose(modal['amplitude'][:, 0, [0, 4]], direct['amplitude'][:, 0, [0, 4]], rtol=1e-2)
+    np.testing.assert_allclose(modal['phase'][:, 0, [0, 4]], direct['phase'][:, 0, [0, 4]], atol=1e-2)
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from resultfile import FORMAT_VERSION, MAGIC, ResultFile, ResultWriter, read_result, write_result
+from solution import ModalSolution
+
+
+def random_solution(rng, num_nodes, num_modes, dtype=np.float64):
+    return ModalSolution(rng.standard_normal((num_nodes, 3)), np.sort(rng.uniform(1, 100, num_modes)),
+                         rng.standard_normal((num_nodes, 6, num_modes)).astype(dtype))
+
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_records_round_trip(tmp_path, mmap):
+    rng = np.random.default_rng(0)
+    solutions = [random_solution(rng, 11, 4), random_solution(rng, 7, 3, np.float32), random_solution(rng, 5, 0)]
+    solver_info = {'solver': 'dense', 'iterations': None, 'residual_norms': np.array([1e-12, 2e-12])}
+    path = str(tmp_path / 'result.wfr')
+    write_result(path, solutions[0], inputs={'forces': {'f_head': 1.}}, solver_info=solver_info)
+    with ResultWriter(path, append=True) as writer:
+        for index, solution in enumerate(solutions[1:], 1):
+            writer.write(solution, metadata={'configuration': index})
+    result_file = ResultFile(path, mmap)
+    assert len(result_file) == len(solutions)
+    for solution, read in zip(solutions, result_file):
+        assert read.displacements.dtype == solution.displacements.dtype
+        np.testing.assert_array_equal(read.nodes, solution.nodes)
+        np.testing.assert_array_equal(read.eigenfreqs, solution.eigenfreqs)
+        np.testing.assert_array_equal(read.displacements, solution.displacements)
+    read, header = read_result(path, 0, mmap)
+    assert header['inputs'] == {'forces': {'f_head': 1.}} and header['metadata'] is None
+    assert header['solver'] == {'solver': 'dense', 'iterations': None, 'residual_norms': [1e-12, 2e-12]}
+    assert read_result(path, 2, mmap)[1]['metadata'] == {'configuration': 2}
+
+
+def test_invalid_files_are_rejected(tmp_path):
+    path = str(tmp_path / 'result.wfr')
+    write_result(path, random_solution(np.random.default_rng(0), 3, 2))
+    with open(path, "rb") as file:
+        data = file.read()
+    with open(path, "wb") as file:
+        file.write(b'NOTAWFR!' + data[len(MAGIC):])
+    with pytest.raises(ValueError, match="not a WindForce result file"):
+        ResultFile(path)
+    with open(path, "wb") as file:
+        file.write(MAGIC + (FORMAT_VERSION + 1).to_bytes(4, 'little') + data[len(MAGIC) + 4:])
+    with pytest.raises(ValueError, match="format version"):
+        ResultFile(path)
+    with open(path, "wb") as file:
+        file.write(data + data[:5])
+    with pytest.raises(ValueError, match="truncated"):
+        ResultFile(path)
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from scipy.integrate import solve_ivp
+from calculation import Calculation
+from sweep import INPUT_KEYS
+from timehistory import iter_time_history, write_time_history
+from test_calculation import example_input
+
+
+@pytest.fixture(scope='module')
+def calculation():
+    input_parameters = example_input(fem_nbr_eigen_freq=4)
+    input_parameters['forces'].update(f_excite=0.5, f_head=1e5, m_head=2e5, nbr_periods=4, delta_t=0.01)
+    calculation = Calculation(*[input_parameters[key] for key in INPUT_KEYS])
+    calculation.modal_basis()
+    return calculation
+
+
+def time_history(calculation, method='exact', chunk_size=8192):
+    times, displacements = zip(*iter_time_history(calculation, method=method, chunk_size=chunk_size))
+    return np.concatenate(times), np.concatenate(displacements)
+
+
+@pytest.mark.parametrize('method, rtol', [('exact', 2e-4), ('newmark', 3e-3)])
+def test_time_history_matches_solve_ivp(calculation, method, rtol):
+    times, displacements = time_history(calculation, method)
+    omega, eigenvectors = calculation.modal_basis()
+    damping = calculation.calculation_param['fem_dmas']
+    modal_load = eigenvectors.T @ calculation.calc_head_load()
+    f_excite = calculation.forces['f_excite']
+
+    def modal_equations(t, state):
+        q, q_dot = np.split(state, 2)
+        return np.concatenate([q_dot, modal_load * np.sin(2 * np.pi * f_excite * t) -
+                               2 * damping * omega * q_dot - omega ** 2 * q])
+
+    reference = solve_ivp(modal_equations, (0, times[-1]), np.zeros(2 * omega.size), method='DOP853', t_eval=times,
+                          rtol=1e-10, atol=1e-14)
+    head_dofs = calculation.dof_map[6 * calculation.mesh.head_node + np.array([0, 4])]
+    expected = eigenvectors[head_dofs] @ reference.y[:omega.size]
+    actual = displacements[:, 0, [0, 4]].T
+    # Errors relative to the amplitude of each DOF
+    scale = np.abs(expected).max(axis=1, keepdims=True)
+    np.testing.assert_allclose(actual / scale, expected / scale, rtol=0, atol=rtol)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 100])
+def test_time_history_is_independent_of_chunk_size(calculation, chunk_size, tmp_path):
+    times, displacements = time_history(calculation)
+    chunked_times, chunked_displacements = time_history(calculation, chunk_size=chunk_size)
+    np.testing.assert_array_equal(chunked_times, times)
+    np.testing.assert_allclose(chunked_displacements, displacements, rtol=1e-12,
+                               atol=1e-12 * np.abs(displacements).max())
+    path = str(tmp_path / 'history.npy')
+    assert write_time_history(path, calculation, chunk_size=chunk_size) == times.size
+    np.testing.assert_allclose(np.load(path, mmap_mode='r'), displacements, rtol=1e-12,
+                               atol=1e-12 * np.abs(displacements).max())
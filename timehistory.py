@@ -0,0 +1,202 @@
+"""
+#######################################################################
+LICENSE INFORMATION
+This file is part of Windforce.
+
+Windforce is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+Windforce is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with Windforce. If not, see <https://www.gnu.org/licenses/>.
+#######################################################################
+
+#######################################################################
+Description:
+Modal superposition time history of the harmonic head loads of the forces input. Each modal equation
+    q'' + 2 zeta omega q' + omega^2 q = p(t)
+is advanced by a linear two-state recurrence s_i+1 = A s_i + B0 p_i + B1 p_i+1 (s = [q, q']), which is run as a
+second order IIR filter (scipy.signal.lfilter) in chunks of time steps. The recurrences, filter coefficients, filter
+states and the superposition are computed for all modes at once. lfilter takes one set of coefficients, so it is
+called once per mode and chunk: a recurrence over all modes in NumPy would need a Python loop over the time steps
+instead, while lfilter runs the loop over the time steps in compiled code. Memory is bounded by the chunk size, the
+number of modes and the number of output nodes, not by the mesh size.
+#######################################################################
+"""
+
+import math
+import numpy as np
+from scipy.linalg import expm
+from scipy.signal import lfilter
+
+DEFAULT_CHUNK_SIZE = 8192
+
+
+def modal_recurrence(omega, damping: float, delta_t: float, method: str = 'exact', gamma: float = 0.5,
+                     beta: float = 0.25):
+    """
+    Calculates the recurrence matrices of the modal equations for one time step
+    :param omega: circular eigenfrequencies [rad/s], shape (n_modes,)
+    :param damping: modal damping ratio []
+    :param delta_t: time step [s]
+    :param method: 'exact' (exact for piecewise linear loads) or 'newmark'
+    :param gamma: Newmark parameter gamma
+    :param beta: Newmark parameter beta
+    :return: A of shape (n_modes, 2, 2), B0 and B1 of shape (n_modes, 2)
+    """
+    omega = np.asarray(omega, dtype=np.float64)
+    num_modes = omega.size
+    stiffness = omega ** 2
+    damping_coefficient = 2 * damping * omega
+    if method == 'exact':
+        # Augmented system [q, q', p, p'] with p' = (p_i+1 - p_i) / delta_t constant over the step
+        system = np.zeros((num_modes, 4, 4))
+        system[:, 0, 1] = 1
+        system[:, 1, 0] = -stiffness
+        system[:, 1, 1] = -damping_coefficient
+        system[:, 1, 2] = 1
+        system[:, 2, 3] = 1
+        transition = expm(system * delta_t)
+        a = transition[:, :2, :2]
+        b_ramp = transition[:, :2, 3] / delta_t
+        return a, transition[:, :2, 2] - b_ramp, b_ramp
+    if method == 'newmark':
+        # Unknowns [q_i+1, q'_i+1, q''_i+1] as linear function of [q_i, q'_i, p_i, p_i+1], q''_i from equilibrium
+        lhs = np.zeros((num_modes, 3, 3))
+        lhs[:, 0, 0] = 1
+        lhs[:, 0, 2] = -delta_t ** 2 * beta
+        lhs[:, 1, 1] = 1
+        lhs[:, 1, 2] = -delta_t * gamma
+        lhs[:, 2, 0] = stiffness
+        lhs[:, 2, 1] = damping_coefficient
+        lhs[:, 2, 2] = 1
+        # Acceleration at step i: p_i - c q'_i - k q_i
+        acceleration = np.stack([-stiffness, -damping_coefficient, np.ones(num_modes), np.zeros(num_modes)], axis=1)
+        rhs = np.zeros((num_modes, 3, 4))
+        rhs[:, 0, 0] = 1
+        rhs[:, 0, 1] = delta_t
+        rhs[:, 0] += delta_t ** 2 * (0.5 - beta) * acceleration
+        rhs[:, 1, 1] = 1
+        rhs[:, 1] += delta_t * (1 - gamma) * acceleration
+        rhs[:, 2, 3] = 1
+        step = np.linalg.solve(lhs, rhs)
+        return step[:, :2, :2], step[:, :2, 2], step[:, :2, 3]
+    raise ValueError(f"unknown method '{method}', choose 'exact' or 'newmark'")
+
+
+def recurrence_filter(a, b0, b1):
+    """
+    Converts the recurrences of the modes to the coefficients of the equivalent IIR filters from p to q. The
+    difference equations hold from step 2 on for any initial state.
+    :param a: recurrence matrices A (n_modes, 2, 2)
+    :param b0: B0 (n_modes, 2)
+    :param b1: B1 (n_modes, 2)
+    :return: numerator and denominator coefficients for scipy.signal.lfilter, each of shape (n_modes, 3)
+    """
+    numerator = np.stack([b1[:, 0],
+                          b0[:, 0] - a[:, 1, 1] * b1[:, 0] + a[:, 0, 1] * b1[:, 1],
+                          a[:, 0, 1] * b0[:, 1] - a[:, 1, 1] * b0[:, 0]], axis=1)
+    denominator = np.stack([np.ones(len(a)), -np.trace(a, axis1=1, axis2=2), np.linalg.det(a)], axis=1)
+    return numerator, denominator
+
+
+def filter_states(numerator, denominator, outputs, inputs):
+    """
+    Initial states of the IIR filters for the last two outputs and inputs, like scipy.signal.lfiltic for all modes
+    :param numerator: numerator coefficients (n_modes, 3)
+    :param denominator: denominator coefficients (n_modes, 3)
+    :param outputs: outputs q of the last two steps, latest first, shape (n_modes, 2)
+    :param inputs: inputs p of the last two steps, latest first, shape (n_modes, 2)
+    :return: filter states of shape (n_modes, 2)
+    """
+    return np.stack([numerator[:, 1] * inputs[:, 0] + numerator[:, 2] * inputs[:, 1] -
+                     denominator[:, 1] * outputs[:, 0] - denominator[:, 2] * outputs[:, 1],
+                     numerator[:, 2] * inputs[:, 0] - denominator[:, 2] * outputs[:, 0]], axis=1)
+
+
+def harmonic_head_load(forces):
+    """
+    :param forces: forces input, see ABCCalculation
+    :return: time function of the head loads f(t) = sin(2 pi f_excite t), duration [s], time step [s]
+    """
+    f_excite = forces.get('f_excite', 0)
+    delta_t = forces.get('delta_t', 0)
+    if f_excite <= 0 or delta_t <= 0 or forces.get('nbr_periods', 0) <= 0:
+        raise ValueError("the time history needs f_excite, nbr_periods and delta_t greater than 0")
+    return (lambda t: np.sin(2 * math.pi * f_excite * t)), forces['nbr_periods'] / f_excite, delta_t
+
+
+def iter_time_history(calculation, nodes=None, method: str = 'exact', chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Calculates the displacement time history of the harmonic head loads (see Calculation.calc_head_load and
+    harmonic_head_load) by modal superposition of the computed modes, starting at rest. The damping ratio of all modes
+    is calculation_param['fem_dmas'], the Newmark parameters gamma and beta are forces['num_1'] and forces['num_2']
+    (defaults 0.5 and 0.25 if 0).
+    :param calculation: calculation.Calculation, solved if necessary (see Calculation.modal_basis)
+    :param nodes: indices of the output nodes, defaults to the tower head (see mesh.Mesh.head_node)
+    :param method: 'exact' (exact for piecewise linear loads, unconditionally stable) or 'newmark'
+    :param chunk_size: number of time steps per chunk
+    :return: generator of (times [s] of shape (n,), displacements of shape (n, n_nodes, 6) [m], [rad])
+    """
+    omega, eigenvectors = calculation.modal_basis()
+    load_function, duration, delta_t = harmonic_head_load(calculation.forces)
+    num_steps = int(round(duration / delta_t)) + 1
+    nodes = np.atleast_1d(calculation.mesh.head_node if nodes is None else np.asarray(nodes))
+    # Mode shapes at the output DOFs, constrained DOFs are zero
+    output_dofs = (6 * nodes[:, np.newaxis] + np.arange(6)).ravel()
+    output_free = calculation.dof_map[output_dofs]
+    output_modes = np.zeros((output_dofs.size, omega.size))
+    output_modes[output_free >= 0] = eigenvectors[output_free[output_free >= 0]]
+    modal_load = eigenvectors.T @ calculation.calc_head_load()
+
+    gamma = calculation.forces.get('num_1', 0) or 0.5
+    beta = calculation.forces.get('num_2', 0) or 0.25
+    a, b0, b1 = modal_recurrence(omega, calculation.calculation_param['fem_dmas'], delta_t, method, gamma, beta)
+    numerators, denominators = recurrence_filter(a, b0, b1)
+
+    # The first two steps follow from the recurrence with the initial state at rest, they set the filter states
+    load_start = load_function(np.array([0, delta_t]))
+    q_start = np.zeros((omega.size, 2))
+    q_start[:, 1] = (b0[:, 0] * load_start[0] + b1[:, 0] * load_start[1]) * modal_load
+    states = filter_states(numerators, denominators, q_start[:, ::-1], load_start[::-1] * modal_load[:, np.newaxis])
+
+    for first_step in range(0, num_steps, chunk_size):
+        steps = np.arange(first_step, min(first_step + chunk_size, num_steps))
+        times = steps * delta_t
+        load = load_function(times)
+        q = np.empty((omega.size, steps.size))
+        filtered = steps >= 2
+        q[:, ~filtered] = q_start[:, steps[~filtered]]
+        mode_loads = load[filtered] * modal_load[:, np.newaxis]
+        # lfilter returns undefined states for an empty input, e.g. a first chunk of at most two steps
+        for mode in range(omega.size if filtered.any() else 0):
+            q[mode, filtered], states[mode] = lfilter(numerators[mode], denominators[mode], mode_loads[mode],
+                                                      zi=states[mode])
+        yield times, (q.T @ output_modes.T).reshape(steps.size, nodes.size, 6)
+
+
+def write_time_history(path: str, calculation, nodes=None, method: str = 'exact',
+                       chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Streams the displacement time history (see iter_time_history) into a .npy file of shape (n_steps, n_nodes, 6),
+    step i is at time i * forces['delta_t']. The file can be opened memory-mapped with np.load(path, mmap_mode='r').
+    :param path: file path
+    :return: number of time steps
+    """
+    _, duration, delta_t = harmonic_head_load(calculation.forces)
+    num_steps = int(round(duration / delta_t)) + 1
+    num_nodes = 1 if nodes is None else np.atleast_1d(nodes).size
+    output = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64, shape=(num_steps, num_nodes, 6))
+    written = 0
+    for times, displacements in iter_time_history(calculation, nodes, method, chunk_size):
+        output[written:written + times.size] = displacements
+        written += times.size
+    output.flush()
+    del output
+    return num_steps